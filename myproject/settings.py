@@ -92,6 +92,28 @@ DATABASES = {
 }
 
 
+# Cache
+# Версии инвалидации страниц, индексы прав, количества постов и каталог категорий
+# должны быть общими для всех процессов приложения. locmem подходит только для
+# одного процесса (runserver); при нескольких воркерах нужен redis (пакет redis),
+# memcached (пакет pymemcache) или db (python manage.py createcachetable).
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'wordflow'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'wordflow_cache'),
+}
+_cache_backend, _cache_location = _CACHE_BACKENDS[CACHE_BACKEND]
+CACHES = {
+    "default": {
+        "BACKEND": _cache_backend,
+        "LOCATION": CACHE_LOCATION or _cache_location,
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -124,6 +146,12 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [STATIC_DIR]
 MEDIA_URL = "media/"
 MEDIA_ROOT = MEDIA_DIR
+# Передача медиафайлов фронт-прокси: '' (сам Django), 'nginx' (X-Accel-Redirect) или 'apache' (X-Sendfile)
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default='')
+# internal location nginx, указывающий на MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+# Удаление поста только помечает его; строки вычищает команда purge_deleted_posts
+POST_TOMBSTONE_DELETE = config('POST_TOMBSTONE_DELETE', default=False, cast=bool)
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -132,6 +160,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Настройки для системы просмотров
 # Время жизни сессии для просмотров анонимных пользователей (в секундах)
 ANONYMOUS_VIEW_SESSION_TIMEOUT = 86400  # 24 часа
+# Интервал сброса буфера просмотров в базу (в секундах, 0 - запись сразу)
+VIEW_COUNT_FLUSH_INTERVAL = config('VIEW_COUNT_FLUSH_INTERVAL', default=10, cast=int)
 
 # Настройки сессий
 SESSION_COOKIE_AGE = 86400  # 24 часа
@@ -15,15 +15,15 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path,include
+from django.urls import path,include,re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from wordflow.views import serve_media
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('ckeditor/', include('ckeditor_uploader.urls')),
+    # Медиафайлы отдаются и в продакшене (static() работает только при DEBUG)
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
     path("",include("wordflow.urls"))
-]
-  
-urlpatterns += static(settings.MEDIA_URL,document_root=settings.MEDIA_ROOT)  
\ No newline at end of file
+]  
\ No newline at end of file
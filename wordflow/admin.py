@@ -2,21 +2,22 @@ from django.contrib import admin
 from django.contrib.sessions.models import Session
 from django.contrib.auth.models import User
 from .models import Post, Comment, PostView, PostLike, PostEditor, Category
+from .deletion import delete_posts, delete_users
 # Register your models here.
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('postname', 'user', 'category', 'views', 'likes', 'time', 'get_editors_count')
-    list_filter = ('category', 'user', 'time', 'category_obj')
-    search_fields = ('postname', 'content', 'category', 'user__username')
-    readonly_fields = ('views', 'likes', 'time')
+    list_display = ('postname', 'user', 'category_obj', 'views', 'likes', 'comments_count', 'time', 'get_editors_count')
+    list_filter = ('category_obj', 'user', 'time')
+    search_fields = ('postname', 'content', 'category_obj__name', 'user__username')
+    readonly_fields = ('views', 'likes', 'comments_count', 'word_count', 'reading_time', 'time')
     
     fieldsets = (
         ('Основная информация', {
-            'fields': ('postname', 'content', 'user', 'category', 'category_obj', 'image')
+            'fields': ('postname', 'content', 'user', 'category_obj', 'image')
         }),
         ('Статистика', {
-            'fields': ('views', 'likes', 'time'),
+            'fields': ('views', 'likes', 'comments_count', 'word_count', 'reading_time', 'time'),
             'classes': ('collapse',)
         }),
     )
@@ -30,10 +31,16 @@ class PostAdmin(admin.ModelAdmin):
             obj.user = request.user
         super().save_model(request, obj, form, change)
 
+    def delete_model(self, request, obj):
+        delete_posts([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_posts(queryset.values_list('pk', flat=True))
+
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('get_content_preview', 'user', 'post', 'time')
-    list_filter = ('user', 'time', 'post__category')
+    list_filter = ('user', 'time', 'post__category_obj')
     search_fields = ('content', 'user__username', 'post__postname')
     readonly_fields = ('time',)
     
@@ -44,20 +51,20 @@ class CommentAdmin(admin.ModelAdmin):
 @admin.register(PostView)
 class PostViewAdmin(admin.ModelAdmin):
     list_display = ('user', 'post', 'viewed_at')
-    list_filter = ('viewed_at', 'post__category')
+    list_filter = ('viewed_at', 'post__category_obj')
     search_fields = ('user__username', 'post__postname')
 
 @admin.register(PostLike)
 class PostLikeAdmin(admin.ModelAdmin):
     list_display = ('user', 'post', 'liked_at')
-    list_filter = ('liked_at', 'post__category')
+    list_filter = ('liked_at', 'post__category_obj')
     search_fields = ('user__username', 'post__postname')
     readonly_fields = ('liked_at',)
 
 @admin.register(PostEditor)
 class PostEditorAdmin(admin.ModelAdmin):
     list_display = ('post', 'user', 'assigned_by', 'assigned_at')
-    list_filter = ('assigned_at', 'assigned_by', 'post__category')
+    list_filter = ('assigned_at', 'assigned_by', 'post__category_obj')
     search_fields = ('post__postname', 'user__username', 'assigned_by__username')
     readonly_fields = ('assigned_at',)
 
@@ -84,6 +91,12 @@ class UserAdmin(BaseUserAdmin):
         return Comment.objects.filter(user=obj).count()
     get_comments_count.short_description = 'Комментариев'
 
+    def delete_model(self, request, obj):
+        delete_users([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_users(queryset.values_list('pk', flat=True))
+
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
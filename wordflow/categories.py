@@ -0,0 +1,110 @@
+"""
+Каталог категорий WordFlow
+
+Категории с количеством постов загружаются одним запросом и хранятся
+в памяти процесса вместе с индексами по id, slug и названию. Актуальность
+проверяется по версии в кеше по умолчанию: сигналы категорий и постов
+увеличивают ее, и следующий запрос перечитывает каталог. Другие воркеры
+видят новую версию только с общим бэкендом кеша (CACHE_BACKEND); с LocMem
+их каталог обновляется по CATEGORY_REGISTRY_TIMEOUT. В установившемся режиме
+выпадающий список и фильтр категорий не обращаются к базе.
+"""
+
+import threading
+import time
+from typing import List, Optional
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.text import slugify
+from .constants import CATEGORY_REGISTRY_TIMEOUT
+
+CATEGORY_VERSION_KEY = 'wordflow:categories:version'
+
+
+def _get_version() -> int:
+    version = cache.get(CATEGORY_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(CATEGORY_VERSION_KEY, version, None):
+            version = cache.get(CATEGORY_VERSION_KEY, version)
+    return version
+
+
+def invalidate_categories() -> None:
+    """Помечает каталог категорий устаревшим (во всех процессах при общем кеше)"""
+    try:
+        cache.incr(CATEGORY_VERSION_KEY)
+    except ValueError:
+        cache.set(CATEGORY_VERSION_KEY, time.time_ns(), None)
+
+
+class _Snapshot:
+    """Неизменяемый снимок каталога"""
+
+    def __init__(self, categories, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.categories = categories
+        self.by_id = {category.id: category for category in categories}
+        self.by_slug = {category.slug: category for category in categories}
+        self.by_name = {category.name.casefold(): category for category in categories}
+
+
+class CategoryRegistry:
+    """Категории поста с количеством постов (атрибуты slug и post_count)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _load(self, version) -> _Snapshot:
+        from .models import Category
+        categories = list(Category.objects.annotate(
+            post_count=Count('post', filter=Q(post__deleted_at__isnull=True))
+        ).order_by('name'))
+        used = set()
+        for category in categories:
+            # Названия уникальны, но разные названия могут дать один slug
+            slug = slugify(category.name, allow_unicode=True) or str(category.id)
+            if slug in used or slug.isdigit():
+                slug = f'{slug}-{category.id}'
+            used.add(slug)
+            category.slug = slug
+        return _Snapshot(categories, version)
+
+    def _current(self) -> _Snapshot:
+        version = _get_version()
+        snapshot = self._snapshot
+        if (snapshot is None or snapshot.version != version or
+                time.monotonic() - snapshot.loaded_at > CATEGORY_REGISTRY_TIMEOUT):
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version or \
+                        time.monotonic() - snapshot.loaded_at > CATEGORY_REGISTRY_TIMEOUT:
+                    snapshot = self._snapshot = self._load(version)
+        return snapshot
+
+    def all(self) -> List:
+        """Все категории по названию"""
+        return self._current().categories
+
+    def get(self, category_id) -> Optional[object]:
+        return self._current().by_id.get(category_id)
+
+    def resolve(self, value: str) -> Optional[object]:
+        """
+        Находит категорию по значению параметра ?category=
+
+        Точное совпадение id, slug или названия (без учета регистра),
+        без поиска по подстроке.
+        """
+        value = (value or '').strip()
+        if not value:
+            return None
+        snapshot = self._current()
+        if value.isdigit():
+            return snapshot.by_id.get(int(value))
+        return snapshot.by_slug.get(value) or snapshot.by_name.get(value.casefold())
+
+
+category_registry = CategoryRegistry()
@@ -0,0 +1,24 @@
+"""
+Проверки конфигурации WordFlow
+
+Запускаются командой manage.py check --deploy.
+"""
+
+from django.core.checks import Tags, Warning, register
+from .utils import cache_is_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Инвалидация кешей сигналами работает между воркерами только через общий кеш"""
+    if cache_is_shared():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'Page cache versions, post counts, permission indexes and the category catalogue '
+            'are invalidated only in the worker that handled the change. Set CACHE_BACKEND to redis, '
+            'memcached or db when running more than one worker.'
+        ),
+        id='wordflow.W001',
+    )]
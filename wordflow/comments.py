@@ -0,0 +1,41 @@
+"""
+Загрузка веток комментариев для приложения WordFlow
+
+Все комментарии поста выбираются одним запросом вместе с авторами,
+дерево ответов строится в Python, а готовые списки ответов кладутся
+в кеш prefetch, поэтому ``comment.replies.all`` в шаблоне не обращается к базе.
+"""
+
+from typing import Dict, List
+from .models import Comment, Post
+
+
+def _set_prefetched_replies(comment: Comment, replies: List[Comment]) -> None:
+    """Подставляет ответы так же, как это делает prefetch_related"""
+    queryset = comment.replies.all()
+    queryset._result_cache = replies
+    queryset._prefetch_done = True
+    comment._prefetched_objects_cache = {'replies': queryset}
+
+
+def load_comment_thread(post: Post) -> List[Comment]:
+    """
+    Возвращает комментарии верхнего уровня с подгруженными ответами
+
+    Порядок комментариев и ответов - по id, как в Meta.ordering модели.
+    """
+    comments = list(Comment.objects.filter(post=post).select_related('user'))
+
+    children: Dict[int, List[Comment]] = {comment.id: [] for comment in comments}
+    roots = []
+    for comment in comments:
+        # Пост уже загружен - не даем шаблону выбирать его для каждого комментария
+        comment.post = post
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in children:
+            children[comment.parent_id].append(comment)
+
+    for comment in comments:
+        _set_prefetched_replies(comment, children[comment.id])
+    return roots
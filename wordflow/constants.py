@@ -15,20 +15,76 @@ SORT_NEWEST = 'newest'
 SORT_LIKES = 'likes'
 SORT_VIEWS = 'views'
 SORT_COMMENTS = 'comments'
+SORT_TRENDING = 'trending'
 
 SORT_CHOICES = [
     (SORT_NEWEST, 'По дате (новые)'),
     (SORT_LIKES, 'По лайкам'),
     (SORT_VIEWS, 'По просмотрам'),
     (SORT_COMMENTS, 'По комментариям'),
+    (SORT_TRENDING, 'В тренде'),
 ]
 
+# Поле сортировки для каждого варианта (по убыванию, затем по -id)
+SORT_FIELDS = {
+    SORT_NEWEST: None,
+    SORT_LIKES: 'likes',
+    SORT_VIEWS: 'views',
+    SORT_COMMENTS: 'comments_count',
+    SORT_TRENDING: 'hot_score',
+}
+
+# Рейтинг «в тренде»: активность затухает вдвое за период полураспада
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WEIGHTS = {'likes': 3, 'views': 0.1, 'comments_count': 5}
+
+# Сколько страниц обслуживается через ?page=, дальше ссылки переходят на курсоры
+MAX_OFFSET_PAGES = 5
+
+# Кеширование количества постов для пагинации
+POST_COUNT_CACHE_TIMEOUT = 600  # 10 минут
+# Начиная с этого размера таблицы для нефильтрованных лент берется оценка из статистики БД
+APPROXIMATE_COUNT_THRESHOLD = 10000
+# Количество номеров страниц вокруг текущей и на краях пагинации
+PAGE_RANGE_ON_EACH_SIDE = 2
+PAGE_RANGE_ON_ENDS = 1
+
+# Настройки полнотекстового поиска
+SEARCH_RESULTS_PER_PAGE = 10
+SEARCH_TITLE_WEIGHT = 3
+MAX_SEARCH_TERM_LENGTH = 64
+MAX_SEARCH_QUERY_TERMS = 10
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_STATS_CACHE_TIMEOUT = 300  # 5 минут
+
+# Кеш страниц для анонимных пользователей (инвалидируется сигналами, TTL ограничивает
+# только устаревание счетчика просмотров)
+PAGE_CACHE_TIMEOUT = 600  # 10 минут
+PAGE_CACHE_QUERY_PARAMS = ('category', 'sort', 'page', 'cursor')
+
+# Кеш индекса прав пользователя (сбрасывается сигналами при смене редакторов).
+# С LocMem сброс не доходит до других воркеров, поэтому TTL ограничивает,
+# сколько снятый редактор сохраняет права в чужом процессе
+PERMISSION_CACHE_TIMEOUT = 600  # 10 минут
+PERMISSION_LOCAL_CACHE_TIMEOUT = 30  # 30 секунд
+
+# Каталог категорий в памяти процесса (сбрасывается сигналами, TTL страхует
+# от пропущенной инвалидации)
+CATEGORY_REGISTRY_TIMEOUT = 600  # 10 минут
+
+# Кеш отрендеренных карточек постов (ключ включает версию карточки)
+POST_CARD_CACHE_TIMEOUT = 300  # 5 минут
+
 # Константы для моделей
 DEFAULT_LIKES = 0
 DEFAULT_VIEWS = 0
+DEFAULT_COMMENTS = 0
 MAX_POST_NAME_LENGTH = 600
 MAX_CATEGORY_NAME_LENGTH = 100
 MAX_COMMENT_LENGTH = 200
+POST_EXCERPT_LENGTH = 500
+READING_WORDS_PER_MINUTE = 200
 MAX_DELETED_MESSAGE_LENGTH = 100
 
 # Константы для форм склонения
@@ -49,6 +105,28 @@ LOGIN_COOLDOWN_MINUTES = 15
 MAX_IMAGE_SIZE_MB = 5
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
 
+# Производные изображения постов: ширины карточек (1x/2x) и страницы поста
+IMAGE_DERIVATIVE_WIDTHS = (400, 800, 1200)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVES_DIR = 'images/posts/derivatives'
+
+# Уменьшение картинок из содержимого постов по запросу
+IMAGE_RESIZE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_RESIZE_FORMATS = ('webp', 'jpeg')
+IMAGE_RESIZE_CACHE_DIR = 'cache/resized'
+IMAGE_RESIZE_CACHE_MAX_AGE_DAYS = 30  # копии старше удаляет gc_media и создает заново по запросу
+CONTENT_IMAGE_DEFAULT_WIDTH = 960
+CONTENT_IMAGE_SIZES = '(min-width: 992px) 66vw, 100vw'
+
+# Кеширование медиафайлов браузером
+MEDIA_MAX_AGE = 60 * 60 * 24  # сутки
+IMMUTABLE_MEDIA_MAX_AGE = 60 * 60 * 24 * 365  # год: файлы с хешем в имени не меняются
+MEDIA_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Сборка неиспользуемых медиафайлов
+MEDIA_GC_GRACE_HOURS = 24
+MEDIA_QUARANTINE_DIR = '.quarantine'
+
 # Сообщения для пользователей
 MESSAGES = {
     'post_created': 'Пост успешно создан',
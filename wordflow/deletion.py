@@ -0,0 +1,206 @@
+"""
+Удаление постов и пользователей WordFlow
+
+Зависимые строки (лайки, просмотры, редакторы, комментарии и их лайки,
+поисковый индекс) удаляются запросами DELETE ... WHERE ... IN (...) в одной
+транзакции, без загрузки строк в Python сборщиком Django. Пост можно
+пометить удаленным сразу и вычистить позже командой purge_deleted_posts.
+"""
+
+from typing import Dict, Iterable, List, Set
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from . import search
+from .models import (
+    Comment, CommentLike, GlobalEditor, Post, PostEditor, PostLike, PostSearchDocument,
+    PostSearchTerm, PostView
+)
+from .page_cache import invalidate_listing_pages, invalidate_post_page, invalidate_post_sidebar
+from .categories import invalidate_categories
+from .pagination import invalidate_post_counts
+from .permissions import invalidate_user_permissions
+from .trending import hot_score_update
+
+# Максимальное количество id в одном запросе
+DELETE_BATCH_SIZE = 500
+
+
+def _raw_delete(queryset) -> int:
+    """DELETE одним запросом: без сигналов и без обхода связей сборщиком"""
+    return queryset._raw_delete(queryset.db)
+
+
+def _batches(ids: List[int]):
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        yield ids[start:start + DELETE_BATCH_SIZE]
+
+
+def _comment_subtree_ids(root_ids: Iterable[int]) -> Set[int]:
+    """id комментариев и всех ответов на них: один запрос на уровень вложенности"""
+    found, frontier = set(root_ids), set(root_ids)
+    while frontier:
+        frontier = set(
+            Comment.objects.filter(parent_id__in=frontier).values_list('id', flat=True)
+        ) - found
+        found |= frontier
+    return found
+
+
+def _decrement_counters(model, field: str, counts: Dict[int, int], version_field: str = None) -> None:
+    """Уменьшает счетчики строк пакетными UPDATE с CASE по id"""
+    items = [(pk, count) for pk, count in counts.items() if count]
+    for start in range(0, len(items), DELETE_BATCH_SIZE):
+        batch = items[start:start + DELETE_BATCH_SIZE]
+        decrement = Case(
+            *[When(pk=pk, then=Value(count)) for pk, count in batch],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        updates = {field: F(field) - decrement}
+        if model is Post:
+            updates['hot_score'] = hot_score_update(**{field: -decrement})
+        if version_field:
+            updates[version_field] = F(version_field) + 1
+        model.objects.filter(pk__in=[pk for pk, _ in batch]).update(**updates)
+
+
+def _count_by(queryset, field: str) -> Dict[int, int]:
+    return dict(queryset.order_by().values_list(field).annotate(total=Count('pk')))
+
+
+def _delete_comments(comment_ids: Set[int], skip_post_ids: Set[int] = frozenset()) -> None:
+    """Удаляет комментарии с лайками и уменьшает счетчики оставшихся постов"""
+    ids = list(comment_ids)
+    visible = Comment.objects.filter(id__in=ids, is_deleted=False).exclude(post_id__in=skip_post_ids)
+    _decrement_counters(Post, 'comments_count', _count_by(visible, 'post_id'), 'card_version')
+    for batch in _batches(ids):
+        _raw_delete(CommentLike.objects.filter(comment_id__in=batch))
+    # Ответы и родители удаляются одним запросом; внешние ключи Django
+    # на PostgreSQL и SQLite проверяются в конце транзакции
+    for batch in _batches(ids):
+        _raw_delete(Comment.objects.filter(id__in=batch))
+
+
+def _delete_post_dependents(post_ids: List[int]) -> None:
+    comment_ids = set(Comment.objects.filter(post_id__in=post_ids).values_list('id', flat=True))
+    _delete_comments(comment_ids, skip_post_ids=set(post_ids))
+    for batch in _batches(post_ids):
+        for model in (PostLike, PostView, PostEditor, PostSearchTerm, PostSearchDocument):
+            _raw_delete(model.objects.filter(post_id__in=batch))
+
+
+def delete_posts(post_ids: Iterable[int]) -> int:
+    """
+    Удаляет посты со всеми зависимыми строками
+
+    Сами посты удаляются обычным delete(): сигналы поста (кеши, поисковая
+    статистика, освобождение изображений) срабатывают как раньше, а связи
+    к этому моменту уже пусты.
+
+    Returns:
+        Количество удаленных постов
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    with transaction.atomic():
+        editor_ids = set(
+            PostEditor.objects.filter(post_id__in=post_ids).values_list('user_id', flat=True)
+        )
+        _delete_post_dependents(post_ids)
+        _, deleted = Post.all_objects.filter(id__in=post_ids).delete()
+        transaction.on_commit(lambda: invalidate_user_permissions(*editor_ids))
+    return deleted.get(Post._meta.label, 0)
+
+
+def tombstone_posts(post_ids: Iterable[int]) -> int:
+    """
+    Помечает посты удаленными: они сразу исчезают из выдачи
+
+    Строки удаляются позже командой purge_deleted_posts.
+
+    Returns:
+        Количество помеченных постов
+    """
+    post_ids = list(post_ids)
+    posts = Post.objects.filter(id__in=post_ids)
+    author_ids = set(posts.values_list('user_id', flat=True))
+    with transaction.atomic():
+        marked = posts.update(deleted_at=timezone.now())
+        # Помеченный пост не должен находиться поиском до окончательного удаления
+        for batch in _batches(post_ids):
+            _raw_delete(PostSearchTerm.objects.filter(post_id__in=batch))
+            _raw_delete(PostSearchDocument.objects.filter(post_id__in=batch))
+
+    search.invalidate_index_stats()
+    invalidate_post_counts()
+    invalidate_categories()
+    invalidate_listing_pages()
+    invalidate_post_sidebar()
+    for post_id in post_ids:
+        invalidate_post_page(post_id)
+    invalidate_user_permissions(*author_ids)
+    return marked
+
+
+def purge_deleted_posts(limit: int = None) -> int:
+    """Окончательно удаляет помеченные посты; возвращает их количество"""
+    ids = Post.all_objects.filter(deleted_at__isnull=False).order_by('id').values_list('id', flat=True)
+    if limit:
+        ids = ids[:limit]
+    return delete_posts(list(ids))
+
+
+def delete_users(user_ids: Iterable[int]) -> int:
+    """
+    Удаляет пользователей, их посты и все их действия на чужих постах
+
+    Счетчики лайков и комментариев чужих постов уменьшаются пакетно.
+
+    Returns:
+        Количество удаленных пользователей
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    with transaction.atomic():
+        post_ids = list(Post.all_objects.filter(user_id__in=user_ids).values_list('id', flat=True))
+        delete_posts(post_ids)
+
+        comment_ids = _comment_subtree_ids(
+            Comment.objects.filter(user_id__in=user_ids).values_list('id', flat=True)
+        )
+        touched_post_ids = set(Comment.objects.filter(id__in=comment_ids).values_list('post_id', flat=True))
+        _delete_comments(comment_ids)
+
+        comment_likes = CommentLike.objects.filter(user_id__in=user_ids)
+        touched_post_ids.update(comment_likes.values_list('comment__post_id', flat=True))
+        _decrement_counters(Comment, 'likes', _count_by(comment_likes, 'comment_id'))
+        _raw_delete(comment_likes)
+        post_likes = PostLike.objects.filter(user_id__in=user_ids)
+        post_like_counts = _count_by(post_likes, 'post_id')
+        touched_post_ids.update(post_like_counts)
+        _decrement_counters(Post, 'likes', post_like_counts, 'card_version')
+        _raw_delete(post_likes)
+        _raw_delete(PostView.objects.filter(user_id__in=user_ids))
+
+        # Назначения, сделанные пользователем, удаляются вместе с ним (CASCADE)
+        editors = PostEditor.objects.filter(Q(user_id__in=user_ids) | Q(assigned_by_id__in=user_ids))
+        global_editors = GlobalEditor.objects.filter(Q(user_id__in=user_ids) | Q(assigned_by_id__in=user_ids))
+        affected_ids = set(editors.values_list('user_id', flat=True)) | set(
+            global_editors.values_list('user_id', flat=True)
+        )
+        _raw_delete(editors)
+        _raw_delete(global_editors)
+
+        # Оставшиеся связи (группы, права, журнал админки) обходит сборщик Django
+        _, deleted = User.objects.filter(id__in=user_ids).delete()
+        transaction.on_commit(lambda: invalidate_user_permissions(*affected_ids))
+
+    invalidate_listing_pages()
+    invalidate_post_sidebar()
+    for post_id in touched_post_ids:
+        invalidate_post_page(post_id)
+    return deleted.get(User._meta.label, 0)
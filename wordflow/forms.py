@@ -12,7 +12,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
+from django.forms.models import ModelChoiceIterator
 from ckeditor.widgets import CKEditorWidget
+from .categories import category_registry
 from .models import Post, Category
 from .constants import MAX_CATEGORY_NAME_LENGTH, ALLOWED_IMAGE_EXTENSIONS, MAX_IMAGE_SIZE_MB
 from .utils import safe_int, truncate_text
@@ -114,6 +116,35 @@ def validate_password_strength(password: str) -> List[str]:
     
     return errors
 
+class _CategoryChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора из каталога категорий, без запроса к базе"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for category in category_registry.all():
+            yield self.choice(category)
+
+    def __len__(self):
+        return len(category_registry.all()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(category_registry.all())
+
+
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Выбор категории: список и проверка значения через каталог категорий"""
+    iterator = _CategoryChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        category = category_registry.get(safe_int(value, None))
+        if category is not None:
+            return category
+        return super().to_python(value)
+
+
 class PostForm(forms.ModelForm):
     content = forms.CharField(
         label='Содержание',
@@ -121,7 +152,7 @@ class PostForm(forms.ModelForm):
         required=True
     )
     
-    category_choice = forms.ModelChoiceField(
+    category_choice = CategoryChoiceField(
         queryset=Category.objects.all(),
         empty_label="Выберите категорию или создайте новую",
         required=False,
@@ -210,7 +241,7 @@ class PostEditForm(forms.ModelForm):
         label='Редакторы'
     )
     
-    category_choice = forms.ModelChoiceField(
+    category_choice = CategoryChoiceField(
         queryset=Category.objects.all(),
         empty_label="Выберите категорию или создайте новую",
         required=False,
@@ -0,0 +1,88 @@
+"""
+Извлечение текста из HTML-содержимого постов WordFlow
+
+Содержимое постов хранится в HTML редактора. Модуль превращает его в
+плоский текст с пробелами на границах блоков (в отличие от strip_tags,
+который склеивает слова соседних абзацев) и считает производные метрики.
+Модуль не обращается к Django ORM.
+"""
+
+import math
+import re
+from html.parser import HTMLParser
+from typing import Tuple
+from .constants import POST_EXCERPT_LENGTH, READING_WORDS_PER_MINUTE
+
+# Теги, после которых в тексте нужен разрыв
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+))
+# Теги, содержимое которых не является текстом поста
+SKIPPED_TAGS = frozenset(('script', 'style', 'template', 'noscript'))
+
+WHITESPACE_RE = re.compile(r'\s+')
+WORD_RE = re.compile(r'\w+')
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Собирает текстовые узлы HTML, пропуская скрипты и стили"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def get_text(self) -> str:
+        return WHITESPACE_RE.sub(' ', ''.join(self._parts)).strip()
+
+
+def html_to_text(content: str) -> str:
+    """Возвращает плоский текст HTML-содержимого"""
+    extractor = HTMLTextExtractor()
+    extractor.feed(content or '')
+    extractor.close()
+    return extractor.get_text()
+
+
+def make_excerpt(text: str, length: int = POST_EXCERPT_LENGTH) -> str:
+    """Обрезает текст до length символов по границе слова"""
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:-') + '…'
+
+
+def text_stats(content: str) -> Tuple[str, int, int]:
+    """
+    Возвращает (отрывок, количество слов, время чтения в минутах)
+
+    Время чтения не меньше минуты для непустого текста.
+    """
+    text = html_to_text(content)
+    word_count = len(WORD_RE.findall(text))
+    reading_time = math.ceil(word_count / READING_WORDS_PER_MINUTE) if word_count else 0
+    return make_excerpt(text), word_count, reading_time
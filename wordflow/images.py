@@ -0,0 +1,165 @@
+"""
+Производные изображения постов WordFlow
+
+Загруженный оригинал перекодируется: ориентация нормализуется по EXIF,
+метаданные (камера, координаты) не сохраняются. Из него строятся
+уменьшенные копии нескольких ширин в форматах WebP и JPEG. Пути копий хранятся в Post.image_derivatives и
+используются шаблонами для srcset. Копии пишутся в хранилище с адресацией
+по содержимому, поэтому одинаковые копии хранятся один раз.
+"""
+
+import os
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .constants import (
+    IMAGE_DERIVATIVE_WIDTHS, IMAGE_DERIVATIVE_FORMATS, IMAGE_DERIVATIVES_DIR
+)
+from .storage import post_image_storage
+
+# Формат Pillow, расширение файла и параметры сохранения
+FORMAT_OPTIONS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+# Форматы оригинала, которые перекодируются в себя же; MPO - JPEG с камер телефонов
+ORIGINAL_FORMATS = {
+    'JPEG': ('JPEG', {'quality': 95, 'optimize': True}),
+    'MPO': ('JPEG', {'quality': 95, 'optimize': True}),
+    'PNG': ('PNG', {'optimize': True}),
+    'WEBP': ('WEBP', {'quality': 90}),
+    'GIF': ('GIF', {}),
+}
+
+
+def derivative_key(fmt: str, width: int) -> str:
+    return f'{fmt}_{width}'
+
+
+def _derivative_name(source_name: str, fmt: str, width: int) -> str:
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    extension = FORMAT_OPTIONS[fmt][1]
+    return f'{IMAGE_DERIVATIVES_DIR}/{stem}_{width}.{extension}'
+
+
+def _target_widths(original_width: int):
+    """Ширины без увеличения; узкий оригинал дает одну копию своей ширины"""
+    widths = [width for width in IMAGE_DERIVATIVE_WIDTHS if width < original_width]
+    if len(widths) < len(IMAGE_DERIVATIVE_WIDTHS):
+        widths.append(original_width)
+    return widths
+
+
+def prepare_mode(image: Image.Image, fmt: str) -> Image.Image:
+    """Приводит режим изображения к поддерживаемому форматом"""
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA')
+    return image
+
+
+def strip_original(upload) -> Optional[ContentFile]:
+    """
+    Перекодирует загруженный оригинал без метаданных и с нормализованной ориентацией
+
+    Цветовой профиль сохраняется. Анимация сохраняется без поворота.
+
+    Returns:
+        новое содержимое или None, если формат не поддерживается
+    """
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            pil_format, options = ORIGINAL_FORMATS.get(image.format, (None, None))
+            if pil_format is None:
+                return None
+            icc_profile = image.info.get('icc_profile')
+            animated = getattr(image, 'is_animated', False)
+            if animated:
+                options = {**options, 'save_all': True}
+            else:
+                image = ImageOps.exif_transpose(image)
+            if icc_profile:
+                options = {**options, 'icc_profile': icc_profile}
+            if pil_format == 'JPEG':
+                image = prepare_mode(image, 'jpeg')
+            buffer = BytesIO()
+            # Параметр exif не передаем - EXIF и GPS в сохраненный файл не попадают
+            image.save(buffer, pil_format, **options)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        upload.seek(0)
+    return ContentFile(buffer.getvalue())
+
+
+def render_derivatives(source_name: str, storage=post_image_storage) -> List[Tuple[str, str, bytes]]:
+    """
+    Кодирует производные копии изображения, не записывая их в хранилище
+
+    Только читает оригинал и не обращается к базе, поэтому может
+    выполняться в дочерних процессах.
+
+    Returns:
+        список (ключ '<формат>_<ширина>', имя файла, содержимое)
+    """
+    with storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        # Анимированные изображения берем по первому кадру
+        image.seek(0)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    rendered = []
+    for width in _target_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in IMAGE_DERIVATIVE_FORMATS:
+            pil_format, _, options = FORMAT_OPTIONS[fmt]
+            buffer = BytesIO()
+            # Параметр exif не передаем - метаданные оригинала в копию не попадают
+            prepare_mode(resized, fmt).save(buffer, pil_format, **options)
+            name = _derivative_name(source_name, fmt, width)
+            rendered.append((derivative_key(fmt, width), name, buffer.getvalue()))
+    return rendered
+
+
+def save_derivatives(rendered: List[Tuple[str, str, bytes]], storage=post_image_storage) -> Dict[str, str]:
+    """Записывает закодированные копии (с учетом ссылок на файлы) и возвращает их пути"""
+    return {key: storage.save(name, ContentFile(content)) for key, name, content in rendered}
+
+
+def generate_derivatives(source_name: str, storage=post_image_storage) -> Dict[str, str]:
+    """
+    Создает производные копии изображения и возвращает их пути
+
+    Returns:
+        словарь {'<формат>_<ширина>': путь в хранилище}
+    """
+    return save_derivatives(render_derivatives(source_name, storage), storage)
+
+
+def delete_derivatives(derivatives: Dict[str, str], storage=post_image_storage) -> None:
+    """Освобождает ссылки на файлы производных копий"""
+    for name in derivatives.values():
+        storage.delete(name)
+
+
+def build_srcset(derivatives: Dict[str, str], fmt: str) -> str:
+    """Возвращает значение srcset для копий одного формата"""
+    candidates = []
+    prefix = f'{fmt}_'
+    for key, name in derivatives.items():
+        if key.startswith(prefix):
+            width = int(key[len(prefix):])
+            candidates.append((width, f'{post_image_storage.url(name)} {width}w'))
+    return ', '.join(candidate for _, candidate in sorted(candidates))
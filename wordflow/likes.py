@@ -0,0 +1,93 @@
+"""
+Сервис лайков для приложения WordFlow
+
+Переключение лайка выполняется условным DELETE/INSERT строки лайка и
+атомарным изменением счетчика через F() в одной транзакции, поэтому
+параллельные клики не теряют обновления и не перезаписывают строку целиком.
+"""
+
+from typing import Tuple
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Model
+from django.db.models.sql import UpdateQuery
+from .models import Post, PostLike, Comment, CommentLike
+from .trending import hot_score_update
+
+# Бэкенды, поддерживающие UPDATE ... RETURNING
+RETURNING_VENDORS = ('postgresql', 'sqlite')
+
+
+def _increment_counter(model, pk: int, field: str, delta: int, version_field: str = None,
+                       extra_updates: dict = None) -> int:
+    """
+    Атомарно изменяет счетчик и возвращает его новое значение
+
+    Где возможно, новое значение возвращается тем же UPDATE (RETURNING),
+    иначе читается одна колонка уже заблокированной строки.
+    Поле version_field, если задано, увеличивается тем же запросом;
+    extra_updates - другие выражения того же UPDATE (видят прежние значения строки).
+    """
+    updates = {field: F(field) + delta, **(extra_updates or {})}
+    if version_field:
+        updates[version_field] = F(version_field) + 1
+    queryset = model._base_manager.filter(pk=pk)
+
+    if connection.vendor in RETURNING_VENDORS and connection.features.can_return_columns_from_insert:
+        # UPDATE строит ORM (выражения F() и функции), остается добавить RETURNING
+        query = queryset.query.chain(UpdateQuery)
+        query.add_update_values(updates)
+        update_sql, params = query.get_compiler(queryset.db).as_sql()
+        column = connection.ops.quote_name(model._meta.get_field(field).column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{update_sql} RETURNING {column}', params)
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    queryset.update(**updates)
+    return queryset.values_list(field, flat=True).first() or 0
+
+
+def _toggle(like_model, target_field: str, target: Model, user, version_field: str = None,
+            update_hot_score: bool = False) -> Tuple[bool, int]:
+    lookup = {f'{target_field}_id': target.pk, 'user': user}
+    with transaction.atomic():
+        deleted, _ = like_model.objects.filter(**lookup).delete()
+        if deleted:
+            is_liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    like_model.objects.create(**lookup)
+            except IntegrityError:
+                # Параллельный запрос уже поставил этот лайк - счетчик не меняем
+                is_liked, delta = True, 0
+            else:
+                is_liked, delta = True, 1
+
+        if delta:
+            # Оценка «в тренде» сдвигается тем же запросом, что и счетчик
+            extra_updates = {'hot_score': hot_score_update(likes=delta)} if update_hot_score else None
+            likes = _increment_counter(type(target), target.pk, 'likes', delta, version_field, extra_updates)
+        else:
+            likes = type(target).objects.filter(pk=target.pk).values_list('likes', flat=True).first() or 0
+    return is_liked, likes
+
+
+def toggle_post_like(post: Post, user) -> Tuple[bool, int]:
+    """
+    Переключает лайк пользователя на посте
+
+    Returns:
+        (стоит ли лайк после переключения, новое количество лайков)
+    """
+    return _toggle(PostLike, 'post', post, user, version_field='card_version', update_hot_score=True)
+
+
+def toggle_comment_like(comment: Comment, user) -> Tuple[bool, int]:
+    """
+    Переключает лайк пользователя на комментарии
+
+    Returns:
+        (стоит ли лайк после переключения, новое количество лайков)
+    """
+    return _toggle(CommentLike, 'comment', comment, user)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from wordflow.html_text import text_stats
+from wordflow.models import Post, TEXT_STATS_FIELDS
+from wordflow.page_cache import invalidate_listing_pages
+
+
+class Command(BaseCommand):
+    help = 'Compute excerpt, word count and reading time for existing posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts processed per chunk')
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Skip posts that already have an excerpt')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.only('id', 'content', *TEXT_STATS_FIELDS).order_by('id')
+        if options['only_missing']:
+            posts = posts.filter(excerpt='')
+
+        last_id, updated = 0, 0
+        while True:
+            chunk = list(posts.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            for post in chunk:
+                post.excerpt, post.word_count, post.reading_time = text_stats(post.content)
+            # bulk_update не вызывает сигналы, поэтому версии карточек увеличиваем сами
+            with transaction.atomic():
+                Post.objects.bulk_update(chunk, TEXT_STATS_FIELDS)
+                Post.objects.filter(id__in=[post.id for post in chunk]).update(
+                    card_version=F('card_version') + 1
+                )
+
+            updated += len(chunk)
+            self.stdout.write(f'Обработано постов: {updated}')
+
+        invalidate_listing_pages()
+        self.stdout.write(self.style.SUCCESS(f'Готово, обновлено постов: {updated}'))
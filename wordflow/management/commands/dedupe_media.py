@@ -0,0 +1,110 @@
+import os
+import shutil
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from wordflow.models import MediaBlob, Post
+from wordflow.page_cache import invalidate_listing_pages, invalidate_post_page, invalidate_post_sidebar
+from wordflow.storage import blob_name, file_digest, is_blob_name, post_image_storage
+
+
+class Command(BaseCommand):
+    help = 'Move post images into content-addressed storage, collapsing duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report duplicates and savings without changing anything')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        posts = list(Post.all_objects.only('id', 'image', 'image_derivatives').order_by('id'))
+
+        # Имя файла -> имя в хранилище с адресацией по содержимому
+        renames, sizes, missing = {}, {}, 0
+        for name in sorted(set(self._referenced_names(posts))):
+            if is_blob_name(name):
+                continue
+            path = post_image_storage.path(name)
+            if not os.path.isfile(path):
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'Файл не найден: {name}'))
+                continue
+            renames[name] = blob_name(os.path.dirname(name), file_digest(path), os.path.splitext(name)[1])
+            sizes[name] = os.path.getsize(path)
+
+        unique = set(renames.values())
+        # Из каждой группы одинаковых файлов остается один, если такого блоба еще нет
+        kept = {new_name: sizes[name] for name, new_name in renames.items()
+                if not os.path.exists(post_image_storage.path(new_name))}
+        saved = sum(sizes.values()) - sum(kept.values())
+        self.stdout.write(
+            f'Файлов к переносу: {len(renames)}, уникальных: {len(unique)}, '
+            f'освободится: {saved // 1024} КБ'
+        )
+        if dry_run:
+            return
+
+        # Сначала создаем файлы с новыми именами: до обновления базы страницы
+        # продолжают ссылаться на старые файлы, и те остаются на месте
+        for name, new_name in renames.items():
+            target = post_image_storage.path(new_name)
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(post_image_storage.path(name), target)
+            except OSError:
+                shutil.copy2(post_image_storage.path(name), target)
+
+        changed = self._rewrite_references(posts, renames)
+
+        for name in renames:
+            os.remove(post_image_storage.path(name))
+
+        invalidate_listing_pages()
+        invalidate_post_sidebar()
+        for post_id in changed:
+            invalidate_post_page(post_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: перенесено файлов {len(renames)}, обновлено постов {len(changed)}, '
+            f'пропущено отсутствующих {missing}'
+        ))
+
+    @staticmethod
+    def _referenced_names(posts):
+        for post in posts:
+            if post.image:
+                yield post.image.name
+            yield from (post.image_derivatives or {}).values()
+
+    def _rewrite_references(self, posts, renames):
+        """Переводит посты на новые имена и пересчитывает счетчики ссылок"""
+        changed = []
+        for post in posts:
+            image = renames.get(post.image.name, post.image.name) if post.image else post.image.name
+            derivatives = {
+                key: renames.get(name, name) for key, name in (post.image_derivatives or {}).items()
+            }
+            if image != post.image.name or derivatives != post.image_derivatives:
+                post.image.name = image
+                post.image_derivatives = derivatives
+                changed.append(post)
+
+        references = Counter(name for name in self._referenced_names(posts) if is_blob_name(name))
+        with transaction.atomic():
+            # bulk_update не вызывает сигналы, поэтому версии карточек увеличиваем сами
+            Post.all_objects.bulk_update(changed, ['image', 'image_derivatives'], batch_size=500)
+            Post.all_objects.filter(id__in=[post.id for post in changed]).update(
+                card_version=F('card_version') + 1
+            )
+            # Счетчики ссылок сверяются с фактическими ссылками постов
+            for name, count in references.items():
+                path = post_image_storage.path(name)
+                if os.path.isfile(path):
+                    MediaBlob.objects.update_or_create(name=name, defaults={
+                        'digest': os.path.splitext(os.path.basename(name))[0],
+                        'size': os.path.getsize(path),
+                        'ref_count': count,
+                    })
+        return [post.id for post in changed]
@@ -0,0 +1,75 @@
+import time
+from django.core.management.base import BaseCommand
+from wordflow.constants import IMAGE_RESIZE_CACHE_MAX_AGE_DAYS, MEDIA_GC_GRACE_HOURS
+from wordflow.media_gc import (
+    find_orphans, is_referenced, purge_quarantine, quarantine, quarantine_path,
+    referenced_media_names, restore, sweep_resize_cache
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete media files that are no longer referenced by any post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=MEDIA_GC_GRACE_HOURS,
+                            help='Only collect files older than this many hours')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts loaded per query while marking')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report orphaned files without moving them')
+        parser.add_argument('--keep-quarantine', action='store_true',
+                            help='Leave collected files in quarantine instead of deleting them')
+        parser.add_argument('--resize-cache-days', type=float, default=IMAGE_RESIZE_CACHE_MAX_AGE_DAYS,
+                            help='Delete resized image cache files older than this many days (0 keeps them)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        grace_seconds = int(options['grace_hours'] * 3600)
+
+        if options['resize_cache_days'] > 0:
+            count, size = sweep_resize_cache(
+                int(options['resize_cache_days'] * 86400), dry_run=options['dry_run']
+            )
+            action = 'устарело' if options['dry_run'] else 'удалено'
+            self.stdout.write(f'Кеш уменьшенных копий: {action} {count} файлов, {size} байт')
+
+        referenced = referenced_media_names(chunk_size)
+        self.stdout.write(f'Файлов со ссылками: {len(referenced)}')
+
+        batch = time.strftime('%Y%m%d-%H%M%S')
+        orphans, total = [], 0
+        for name, size in find_orphans(referenced, grace_seconds):
+            if options['dry_run']:
+                self.stdout.write(f'  {name} ({size} байт)')
+            else:
+                try:
+                    quarantine(batch, name)
+                except FileNotFoundError:
+                    # Файл удален параллельно, пока шел обход
+                    continue
+            orphans.append((name, size))
+            total += size
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Без ссылок: {len(orphans)} файлов, {total} байт'
+            ))
+            return
+
+        # Пока шел обход, новые посты могли сослаться на найденные файлы
+        referenced = referenced_media_names(chunk_size)
+        restored = 0
+        for name, size in orphans:
+            if is_referenced(name, referenced):
+                restore(batch, name)
+                restored += 1
+                total -= size
+
+        if options['keep_quarantine']:
+            self.stdout.write(f'Файлы оставлены в карантине: {quarantine_path(batch)}')
+        else:
+            purge_quarantine(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: собрано {len(orphans) - restored} файлов, освобождено {total} байт, '
+            f'возвращено {restored}'
+        ))
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import F
+from PIL import Image
+from wordflow.images import delete_derivatives, render_derivatives, save_derivatives
+from wordflow.models import Post
+
+
+def _render(post_id, image_name):
+    """
+    Выполняется в дочернем процессе: только читает оригинал и кодирует копии
+
+    Запись в хранилище ведет учет ссылок в базе, поэтому она выполняется
+    в родительском процессе.
+    """
+    try:
+        return post_id, render_derivatives(image_name), None
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        return post_id, None, str(error)
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive image derivatives for existing posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (1 disables the pool)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate derivatives that already exist')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        posts = Post.objects.exclude(image='').order_by('id')
+        if not options['force']:
+            posts = posts.filter(image_derivatives={})
+        tasks = list(posts.values_list('id', 'image'))
+        self.done = self.failed = 0
+
+        if workers == 1:
+            for task in tasks:
+                self._save(*_render(*task))
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения с базой
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_render, *task) for task in tasks]
+                for future in as_completed(futures):
+                    self._save(*future.result())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: обработано {self.done}, ошибок {self.failed}'
+        ))
+
+    def _save(self, post_id, rendered, error):
+        if error is None:
+            try:
+                derivatives = save_derivatives(rendered)
+            except OSError as save_error:
+                error = str(save_error)
+        if error:
+            self.failed += 1
+            self.stdout.write(self.style.ERROR(f'Пост {post_id}: {error}'))
+            return
+
+        with transaction.atomic():
+            previous = Post.objects.select_for_update().filter(pk=post_id).values_list(
+                'image_derivatives', flat=True
+            ).first()
+            Post.objects.filter(pk=post_id).update(
+                image_derivatives=derivatives,
+                card_version=F('card_version') + 1
+            )
+        if previous is None:
+            # Пост удален, пока копии создавались
+            delete_derivatives(derivatives)
+            return
+        # Новые копии уже учтены в счетчиках ссылок, освобождаем все прежние
+        delete_derivatives(previous)
+        self.done += 1
+        self.stdout.write(f'Пост {post_id}: {len(derivatives)} копий')
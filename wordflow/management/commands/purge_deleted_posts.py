@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from wordflow.deletion import purge_deleted_posts
+
+
+class Command(BaseCommand):
+    help = 'Permanently delete posts that were marked as deleted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of posts deleted per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        while True:
+            # Каждая пачка - отдельная транзакция, чтобы не держать блокировки долго
+            deleted = purge_deleted_posts(limit=batch_size)
+            if not deleted:
+                break
+            total += deleted
+            self.stdout.write(f'Удалено постов: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, удалено постов: {total}'))
@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from wordflow.constants import SEARCH_TITLE_WEIGHT
+from wordflow.models import Post, PostSearchDocument, PostSearchTerm
+from wordflow.search import build_index_rows, invalidate_index_stats
+from wordflow.stemmer import analyze_rows
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts analyzed per task')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (1 disables the pool)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = max(1, options['workers'])
+        self.indexed = 0
+
+        # Индекс заменяется по диапазонам id: остальные посты все время находятся поиском
+        if workers == 1:
+            for chunk, rows in self._chunks(chunk_size):
+                self._write(chunk, analyze_rows(rows, SEARCH_TITLE_WEIGHT))
+        else:
+            # Воркеры только анализируют текст, запись в базу выполняет основной процесс
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = {}
+                for chunk, rows in self._chunks(chunk_size):
+                    pending[executor.submit(analyze_rows, rows, SEARCH_TITLE_WEIGHT)] = chunk
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._write(pending.pop(future), future.result())
+                for future, chunk in pending.items():
+                    self._write(chunk, future.result())
+
+        invalidate_index_stats()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано постов: {self.indexed}'))
+
+    def _chunks(self, chunk_size):
+        """
+        Читает посты диапазонами id, не загружая всю таблицу
+
+        Возвращает ((после id, по id включительно, время чтения), строки).
+        """
+        last_id = 0
+        while True:
+            read_at = timezone.now()
+            rows = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'postname', 'content')[:chunk_size]
+            )
+            if not rows:
+                return
+            yield (last_id, rows[-1][0], read_at), rows
+            last_id = rows[-1][0]
+
+    def _write(self, chunk, analyzed):
+        after_id, to_id, read_at = chunk
+        with transaction.atomic():
+            in_range = {'post_id__gt': after_id, 'post_id__lte': to_id}
+            # Пост, сохраненный после чтения диапазона, уже переиндексирован сигналом
+            # по новому тексту - его записи не трогаем
+            fresh_ids = set(PostSearchDocument.objects.filter(
+                indexed_at__gte=read_at, **in_range
+            ).values_list('post_id', flat=True))
+            # Заодно удаляются записи постов, которых больше нет в диапазоне
+            PostSearchTerm.objects.filter(**in_range).exclude(post_id__in=fresh_ids).delete()
+            PostSearchDocument.objects.filter(**in_range).exclude(post_id__in=fresh_ids).delete()
+
+            documents, terms = [], []
+            for post_id, frequencies in analyzed:
+                if post_id in fresh_ids:
+                    continue
+                document, post_terms = build_index_rows(post_id, frequencies)
+                documents.append(document)
+                terms.extend(post_terms)
+            # Параллельное сохранение поста может успеть вставить свои записи
+            PostSearchDocument.objects.bulk_create(documents, ignore_conflicts=True)
+            PostSearchTerm.objects.bulk_create(terms, batch_size=1000, ignore_conflicts=True)
+
+        self.indexed += len(analyzed)
+        self.stdout.write(f'Проиндексировано постов: {self.indexed}')
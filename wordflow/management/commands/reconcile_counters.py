@@ -0,0 +1,156 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from wordflow.models import Post, PostLike, PostView, Comment, CommentLike
+from wordflow.page_cache import invalidate_listing_pages, invalidate_post_page
+from wordflow.trending import compute_hot_score
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized like, view and comment counters from their source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of ids processed per chunk')
+        parser.add_argument('--start-id', type=int, default=None,
+                            help='Resume from this id (inclusive)')
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help='Stop after this many seconds')
+        parser.add_argument('--only', choices=['posts', 'comments'], default=None,
+                            help='Reconcile only one table')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report differences without writing them')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.dry_run = options['dry_run']
+        budget = options['time_budget']
+        self.deadline = time.monotonic() + budget if budget else None
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('Пробный запуск: изменения не сохраняются'))
+
+        only = options['only']
+        start_id = options['start_id']
+        if only != 'comments':
+            if not self._reconcile('posts', Post, self._reconcile_posts_chunk, start_id):
+                return
+            start_id = None
+        if only != 'posts':
+            self._reconcile('comments', Comment, self._reconcile_comments_chunk, start_id)
+
+    def _reconcile(self, name, model, handle_chunk, start_id):
+        """Обходит таблицу диапазонами id; возвращает False, если время вышло"""
+        bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            return True
+
+        start = max(start_id or bounds['low'], bounds['low'])
+        label = model._meta.verbose_name_plural
+        while start <= bounds['high']:
+            if self.deadline and time.monotonic() > self.deadline:
+                self.stdout.write(self.style.WARNING(
+                    f'Время вышло. Продолжить: --only {name} --start-id {start}'
+                ))
+                return False
+
+            end = start + self.chunk_size - 1
+            with transaction.atomic():
+                changed = handle_chunk(start, end)
+            self.stdout.write(f'{label} {start}-{end}: исправлено {changed}')
+            start = end + 1
+
+        self.stdout.write(self.style.SUCCESS(f'{label}: сверка завершена'))
+        return True
+
+    def _reconcile_posts_chunk(self, start, end):
+        # Строки постов блокируются до подсчета: параллельные лайки, комментарии и сброс
+        # просмотров ждут конца транзакции, и их F()-изменения не теряются
+        rows = list(
+            Post.objects.select_for_update().filter(id__range=(start, end))
+            .values_list('id', 'likes', 'views', 'comments_count', 'created_at', 'card_version')
+        )
+        post_range = {'post_id__gte': start, 'post_id__lte': end}
+        likes = self._counts(PostLike.objects.filter(**post_range), 'post_id')
+        viewers = self._counts(PostView.objects.filter(**post_range), 'post_id')
+        comments = self._counts(Comment.objects.filter(is_deleted=False, **post_range), 'post_id')
+
+        changed = {'likes': [], 'views': [], 'comments_count': []}
+        posts = []
+        for post_id, post_likes, post_views, post_comments, created_at, card_version in rows:
+            expected = {
+                'likes': likes.get(post_id, 0),
+                # Анонимные просмотры не пишутся в PostView, поэтому PostView - лишь нижняя граница
+                'views': max(post_views, viewers.get(post_id, 0)),
+                'comments_count': comments.get(post_id, 0),
+            }
+            current = {'likes': post_likes, 'views': post_views, 'comments_count': post_comments}
+            fields = [field for field in expected if expected[field] != current[field]]
+            if not fields:
+                continue
+            for field in fields:
+                changed[field].append(post_id)
+            # Оценка пересчитывается по исправленным счетчикам, карточка получает новую версию
+            posts.append(Post(
+                id=post_id, card_version=card_version + 1,
+                hot_score=compute_hot_score(
+                    expected['likes'], expected['views'], expected['comments_count'], created_at
+                ),
+                **expected
+            ))
+
+        if posts and not self.dry_run:
+            Post.objects.bulk_update(posts, [*changed, 'hot_score', 'card_version'])
+            post_ids = [post.id for post in posts]
+            transaction.on_commit(lambda: self._invalidate_pages(post_ids))
+        return self._report(changed)
+
+    def _reconcile_comments_chunk(self, start, end):
+        rows = list(
+            Comment.objects.select_for_update().filter(id__range=(start, end))
+            .values_list('id', 'post_id', 'likes')
+        )
+        likes = self._counts(
+            CommentLike.objects.filter(comment_id__gte=start, comment_id__lte=end), 'comment_id'
+        )
+
+        changed = {'likes': []}
+        comments, post_ids = [], set()
+        for comment_id, post_id, comment_likes in rows:
+            expected_likes = likes.get(comment_id, 0)
+            if comment_likes != expected_likes:
+                changed['likes'].append(comment_id)
+                comments.append(Comment(id=comment_id, likes=expected_likes))
+                post_ids.add(post_id)
+
+        if comments and not self.dry_run:
+            Comment.objects.bulk_update(comments, ['likes'])
+            # Лайки комментариев видны только на странице поста
+            transaction.on_commit(lambda: [invalidate_post_page(post_id) for post_id in post_ids])
+        return self._report(changed)
+
+    @staticmethod
+    def _counts(queryset, key):
+        """Агрегирует количество строк по ключу одним GROUP BY запросом"""
+        return dict(
+            queryset.order_by().values(key).annotate(total=Count('id')).values_list(key, 'total')
+        )
+
+    @staticmethod
+    def _invalidate_pages(post_ids):
+        """Исправленные счетчики видны в списках, сортировках и на страницах постов"""
+        invalidate_listing_pages()
+        for post_id in post_ids:
+            invalidate_post_page(post_id)
+
+    def _report(self, changed):
+        total = set()
+        for field, ids in changed.items():
+            if not ids:
+                continue
+            total.update(ids)
+            if self.dry_run:
+                shown = ', '.join(str(pk) for pk in ids[:10])
+                self.stdout.write(f'  {field}: {len(ids)} ({shown}{"..." if len(ids) > 10 else ""})')
+        return len(total)
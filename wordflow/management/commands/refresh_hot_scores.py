@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wordflow.models import Post
+from wordflow.page_cache import invalidate_listing_pages
+from wordflow.trending import hot_score_expression, time_base
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending hot_score from counters (fixes drift of incremental updates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of posts updated per query')
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only refresh posts created within this many days')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.all_objects.order_by('id')
+        if options['days']:
+            posts = posts.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+
+        last_id, updated = 0, 0
+        while True:
+            chunk = list(posts.filter(id__gt=last_id).values_list('id', 'created_at')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            # Вклад времени считается в Python, активность - в том же UPDATE по текущим счетчикам
+            bases = {post_id: time_base(created_at) for post_id, created_at in chunk}
+            updated += Post.all_objects.filter(id__in=bases).update(hot_score=hot_score_expression(bases))
+            self.stdout.write(f'Обработано постов: {updated}')
+
+        if updated:
+            invalidate_listing_pages()
+        self.stdout.write(self.style.SUCCESS(f'Готово, обновлено постов: {updated}'))
@@ -0,0 +1,149 @@
+"""
+Отдача медиафайлов WordFlow
+
+Файл передается фронт-прокси через X-Accel-Redirect (nginx) или X-Sendfile
+(Apache, lighttpd), если он настроен; иначе отдается FileResponse, который
+WSGI-сервер с wsgi.file_wrapper передает через os.sendfile. Поддерживаются
+запросы Range и условные запросы по ETag и Last-Modified.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .constants import (
+    IMAGE_RESIZE_CACHE_DIR, IMMUTABLE_MEDIA_MAX_AGE, MEDIA_MAX_AGE, MEDIA_QUARANTINE_DIR,
+    MEDIA_STREAM_CHUNK_SIZE
+)
+from .storage import is_blob_name
+
+SENDFILE_NGINX = 'nginx'
+SENDFILE_APACHE = 'apache'
+
+# Каталоги, где имя файла - хеш содержимого, поэтому файл никогда не меняется
+IMMUTABLE_MEDIA_DIRS = (IMAGE_RESIZE_CACHE_DIR,)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resolve_media_path(path: str) -> str:
+    """Возвращает абсолютный путь файла внутри MEDIA_ROOT или вызывает Http404"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404("Файл не найден")
+    # Файлы в карантине сборщика мусора уже не опубликованы
+    relative = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT))
+    if relative.split(os.sep, 1)[0] == MEDIA_QUARANTINE_DIR:
+        raise Http404("Файл не найден")
+    if not os.path.isfile(full_path):
+        raise Http404("Файл не найден")
+    return full_path
+
+
+def parse_range(header: str, size: int):
+    """
+    Разбирает заголовок Range с одним диапазоном
+
+    Returns:
+        (start, end) включительно, None для отсутствующего/неподдерживаемого
+        заголовка или False для диапазона за пределами файла
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # bytes=-N: последние N байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _cache_control(path: str) -> str:
+    # Файлы хранилища с адресацией по содержимому также не меняются
+    if path.startswith(IMMUTABLE_MEDIA_DIRS) or is_blob_name(path):
+        return f'public, max-age={IMMUTABLE_MEDIA_MAX_AGE}, immutable'
+    return f'public, max-age={MEDIA_MAX_AGE}'
+
+
+def _iter_range(full_path: str, start: int, length: int):
+    with open(full_path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(MEDIA_STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def media_response(request, path: str):
+    """Строит ответ для файла MEDIA_ROOT/path"""
+    full_path = resolve_media_path(path)
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', '')
+        if backend == SENDFILE_NGINX:
+            # Диапазоны и передачу файла обрабатывает nginx
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            # Заголовки должны быть ASCII: иначе Django кодирует их по RFC 2047,
+            # и прокси не найдет файл с кириллицей в имени. Путь в процентной
+            # кодировке nginx и mod_xsendfile декодируют сами
+            response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + path.lstrip('/'))
+        elif backend == SENDFILE_APACHE:
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = quote(full_path)
+        else:
+            response = _local_response(request, full_path, stat.st_size, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = _cache_control(path)
+    return response
+
+
+def _local_response(request, full_path, size, etag, content_type):
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # If-Range с другим ETag означает, что файл изменился - отдаем целиком
+    if if_range is None or if_range == etag:
+        byte_range = parse_range(request.headers.get('Range', ''), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        # Целый файл: WSGI-сервер передаст его через os.sendfile
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _iter_range(full_path, start, length), status=206, content_type=content_type
+    )
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,143 @@
+"""
+Сборка неиспользуемых медиафайлов WordFlow
+
+Пометка: множество путей, на которые ссылаются посты (изображение, его
+копии и <img> в содержании), строится потоковыми запросами по частям.
+Очистка: дерево MEDIA_ROOT обходится через os.scandir, файлы без ссылок
+старше льготного периода переносятся в карантин, после повторной пометки
+нужные возвращаются на место, остальные удаляются. Кеш уменьшенных копий
+не помечается: его файлы и блокировки удаляются по возрасту.
+"""
+
+import os
+import re
+import shutil
+import time
+from typing import Iterator, Set, Tuple
+from urllib.parse import unquote
+from django.conf import settings
+from .constants import IMAGE_RESIZE_CACHE_DIR, MEDIA_QUARANTINE_DIR
+
+# Каталоги, которые сборщик не обходит: кеш копий восстанавливается по запросу
+SKIPPED_MEDIA_DIRS = (IMAGE_RESIZE_CACHE_DIR, MEDIA_QUARANTINE_DIR)
+
+# Миниатюра, которую CKEditor создает рядом с загруженной картинкой
+THUMBNAIL_SUFFIX = '_thumb'
+
+RESIZE_SRC_RE = re.compile(r'[?&](?:amp;)?src=([^&"\'\s<>]+)')
+
+
+def _media_url_re():
+    prefix = '/' + settings.MEDIA_URL.strip('/') + '/'
+    return re.compile(re.escape(prefix) + r'([^"\'\s?#<>]+)')
+
+
+def content_media_names(content: str, media_url_re=None) -> Iterator[str]:
+    """Имена файлов MEDIA_ROOT, на которые ссылается HTML содержания"""
+    if not content:
+        return
+    media_url_re = media_url_re or _media_url_re()
+    for match in media_url_re.finditer(content):
+        yield unquote(match.group(1))
+    # Картинки, направленные на уменьшенные копии, ссылаются на источник параметром src
+    for match in RESIZE_SRC_RE.finditer(content):
+        yield unquote(match.group(1)).lstrip('/')
+
+
+def referenced_media_names(chunk_size: int = 500) -> Set[str]:
+    """Пометка: множество имен файлов, на которые есть ссылки"""
+    from .models import MediaBlob, Post
+    media_url_re = _media_url_re()
+    names = set()
+    # Файлы помеченных удаленными постов нужны до окончательного удаления
+    posts = Post.all_objects.values_list('image', 'image_derivatives', 'content')
+    for image, derivatives, content in posts.iterator(chunk_size=chunk_size):
+        if image:
+            names.add(image)
+        names.update((derivatives or {}).values())
+        names.update(content_media_names(content, media_url_re))
+    # Файл хранилища с учтенными ссылками может принадлежать посту, еще не сохраненному
+    names.update(
+        MediaBlob.objects.filter(ref_count__gt=0).values_list('name', flat=True).iterator(chunk_size=chunk_size)
+    )
+    return names
+
+
+def is_referenced(name: str, referenced: Set[str]) -> bool:
+    if name in referenced:
+        return True
+    stem, extension = os.path.splitext(name)
+    return stem.endswith(THUMBNAIL_SUFFIX) and stem[:-len(THUMBNAIL_SUFFIX)] + extension in referenced
+
+
+def _walk(root: str, relative: str = '') -> Iterator[Tuple[str, os.DirEntry]]:
+    with os.scandir(os.path.join(root, relative)) as entries:
+        for entry in entries:
+            name = f'{relative}/{entry.name}' if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if name not in SKIPPED_MEDIA_DIRS:
+                    yield from _walk(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry
+
+
+def find_orphans(referenced: Set[str], grace_seconds: int) -> Iterator[Tuple[str, int]]:
+    """Очистка: файлы без ссылок старше льготного периода как (имя, размер)"""
+    # Свежие файлы могут принадлежать загрузке, пост которой еще не сохранен
+    cutoff = time.time() - grace_seconds
+    for name, entry in _walk(settings.MEDIA_ROOT):
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime < cutoff and not is_referenced(name, referenced):
+            yield name, stat.st_size
+
+
+def sweep_resize_cache(max_age_seconds: int, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Удаляет из кеша уменьшенных копий файлы старше max_age_seconds
+
+    Копии, файлы блокировок и брошенные временные файлы восстанавливаются
+    по запросу, поэтому удаляются без пометки. Запрос, который держит
+    удаленную блокировку, лишь повторно отрендерит копию.
+
+    Returns:
+        (количество файлов, размер в байтах)
+    """
+    root = os.path.join(settings.MEDIA_ROOT, IMAGE_RESIZE_CACHE_DIR)
+    if not os.path.isdir(root):
+        return 0, 0
+    cutoff = time.time() - max_age_seconds
+    count = total = 0
+    for name, entry in _walk(root):
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime >= cutoff:
+            continue
+        if not dry_run:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        count += 1
+        total += stat.st_size
+    return count, total
+
+
+def quarantine_path(batch: str, name: str = '') -> str:
+    return os.path.join(settings.MEDIA_ROOT, MEDIA_QUARANTINE_DIR, batch, name)
+
+
+def quarantine(batch: str, name: str) -> None:
+    """Переносит файл в карантин, сохраняя относительный путь"""
+    target = quarantine_path(batch, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(os.path.join(settings.MEDIA_ROOT, name), target)
+
+
+def restore(batch: str, name: str) -> None:
+    """Возвращает файл из карантина на прежнее место"""
+    target = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(quarantine_path(batch, name), target)
+
+
+def purge_quarantine(batch: str) -> None:
+    shutil.rmtree(quarantine_path(batch), ignore_errors=True)
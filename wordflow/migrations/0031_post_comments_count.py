@@ -0,0 +1,183 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:06
+
+import ckeditor.fields
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+import wordflow.models
+
+
+def backfill_comments_count(apps, schema_editor):
+    """Заполняет счетчик комментариев одним UPDATE с коррелированным подзапросом"""
+    Post = apps.get_model('wordflow', 'Post')
+    Comment = apps.get_model('wordflow', 'Comment')
+    counts = (
+        Comment.objects.filter(post=OuterRef('pk'), is_deleted=False)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Post.objects.update(
+        comments_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wordflow', '0030_comment_deleted_message_comment_is_deleted_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['id'], 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-id'], 'verbose_name': 'Пост', 'verbose_name_plural': 'Посты'},
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0, help_text='Поддерживается сигналами модели Comment', verbose_name='Количество комментариев'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='content',
+            field=models.CharField(max_length=200, verbose_name='Содержание комментария'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='deleted_message',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Сообщение об удалении'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='Удален'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='liked_by',
+            field=models.ManyToManyField(related_name='liked_comments', through='wordflow.CommentLike', to=settings.AUTH_USER_MODEL, verbose_name='Поставили лайк'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='likes',
+            field=models.IntegerField(default=0, verbose_name='Количество лайков'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='wordflow.comment', verbose_name='Родительский комментарий'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wordflow.post', verbose_name='Пост'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='time',
+            field=models.CharField(blank=True, default=wordflow.models.get_current_time_str, max_length=100, verbose_name='Время создания'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='category',
+            field=models.CharField(help_text='Временное текстовое поле для категории', max_length=100, verbose_name='Категория (текст)'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='category_obj',
+            field=models.ForeignKey(blank=True, help_text='Выберите категорию поста', null=True, on_delete=django.db.models.deletion.SET_NULL, to='wordflow.category', verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='content',
+            field=ckeditor.fields.RichTextField(help_text='Введите содержание поста', verbose_name='Содержание'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='editors',
+            field=models.ManyToManyField(blank=True, related_name='editable_posts', through='wordflow.PostEditor', to=settings.AUTH_USER_MODEL, verbose_name='Редакторы'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(help_text='Загрузите изображение для поста', upload_to='images/posts', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='liked_by',
+            field=models.ManyToManyField(related_name='liked_posts', through='wordflow.PostLike', to=settings.AUTH_USER_MODEL, verbose_name='Поставили лайк'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='likes',
+            field=models.IntegerField(default=0, verbose_name='Количество лайков'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='postname',
+            field=models.CharField(help_text='Введите название поста', max_length=600, verbose_name='Название поста'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='time',
+            field=models.CharField(blank=True, default=wordflow.models.get_current_time_str, max_length=100, verbose_name='Время создания'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='authored_posts', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='viewed_by',
+            field=models.ManyToManyField(related_name='viewed_posts', through='wordflow.PostView', to=settings.AUTH_USER_MODEL, verbose_name='Просмотрели'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='views',
+            field=models.IntegerField(default=0, verbose_name='Количество просмотров'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post'], name='wordflow_co_post_id_9eca23_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user'], name='wordflow_co_user_id_221a02_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent'], name='wordflow_co_parent__59cb25_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-id'], name='wordflow_po_id_af08e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user'], name='wordflow_po_user_id_19a3ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj'], name='wordflow_po_categor_1602d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-comments_count', '-id'], name='wordflow_po_comment_346cd6_idx'),
+        ),
+        migrations.RunPython(backfill_comments_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0032_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='card_version',
+            field=models.PositiveIntegerField(default=0, help_text='Увеличивается при правке, лайке и комментарии; входит в ключ кеша карточки', verbose_name='Версия карточки'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0033_post_card_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', help_text='Начало текста без разметки; вычисляется при сохранении', max_length=500, verbose_name='Отрывок'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, verbose_name='Время чтения (мин)'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество слов'),
+        ),
+    ]
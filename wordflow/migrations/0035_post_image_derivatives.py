@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0034_post_text_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Пути копий по ключам вида webp_400; создаются при загрузке', verbose_name='Уменьшенные копии изображения'),
+        ),
+    ]
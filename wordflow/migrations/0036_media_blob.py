@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:26
+
+from django.db import migrations, models
+import wordflow.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0035_post_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(help_text='Загрузите изображение для поста', storage=wordflow.storage.ContentAddressedStorage(), upload_to='images/posts', verbose_name='Изображение'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0036_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Пост помечен удаленным и ждет окончательного удаления', null=True, verbose_name='Удален'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0037_post_deleted_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='wordflow_co_post_id_9eca23_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='wordflow_po_user_id_19a3ca_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='wordflow_po_categor_1602d3_idx',
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, help_text='Пост помечен удаленным и ждет окончательного удаления', null=True, verbose_name='Удален'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'id'], name='wordflow_co_post_id_a41414_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentlike',
+            index=models.Index(fields=['user', 'comment'], name='wordflow_co_user_id_561c78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-id'], name='wordflow_po_user_id_11b1a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-likes', '-id'], name='wordflow_po_likes_a58fae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-views', '-id'], name='wordflow_po_views_8791d0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj', '-id'], name='wordflow_po_categor_119449_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj', '-comments_count', '-id'], name='wordflow_po_categor_4e47c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj', '-likes', '-id'], name='wordflow_po_categor_7ee8ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj', '-views', '-id'], name='wordflow_po_categor_a999d5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='wordflow_post_tombstoned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['user', 'post'], name='wordflow_po_user_id_69301d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postview',
+            index=models.Index(fields=['user', 'post'], name='wordflow_po_user_id_f1a112_idx'),
+        ),
+    ]
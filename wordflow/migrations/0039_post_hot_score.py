@@ -0,0 +1,76 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:34
+
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+BATCH_SIZE = 500
+
+# Формула wordflow.trending на момент миграции: код приложения может измениться
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+TRENDING_TAU_SECONDS = 24 * 3600 / math.log(2)
+TRENDING_WEIGHTS = {'likes': 3, 'views': 0.1, 'comments_count': 5}
+
+
+def _hot_score(post):
+    engagement = (
+        1 + TRENDING_WEIGHTS['likes'] * post.likes
+        + TRENDING_WEIGHTS['views'] * post.views
+        + TRENDING_WEIGHTS['comments_count'] * post.comments_count
+    )
+    age = (post.created_at - TRENDING_EPOCH).total_seconds()
+    return math.log(max(engagement, 1)) + age / TRENDING_TAU_SECONDS
+
+
+def backfill_created_at_and_hot_score(apps, schema_editor):
+    """Восстанавливает дату создания из текстового поля time и считает оценки пакетами по id"""
+    Post = apps.get_model('wordflow', 'Post')
+    last_id = 0
+    while True:
+        batch = list(
+            Post.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'time', 'likes', 'views', 'comments_count', 'created_at')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for post in batch:
+            try:
+                created = datetime.strptime(post.time.strip(), '%d %B %Y')
+            except (AttributeError, ValueError):
+                created = None
+            if created is not None:
+                post.created_at = timezone.make_aware(created)
+            post.hot_score = _hot_score(post)
+        Post.objects.bulk_update(batch, ['created_at', 'hot_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0038_listing_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Создан'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0.0, editable=False, help_text='Активность с затуханием по возрасту; обновляется вместе со счетчиками', verbose_name='Оценка «в тренде»'),
+        ),
+        migrations.RunPython(backfill_created_at_and_hot_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='wordflow_po_hot_sco_4a1f52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category_obj', '-hot_score', '-id'], name='wordflow_po_categor_c65789_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:12
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_category_obj(apps, schema_editor):
+    """
+    Привязывает к категории каждый пост, у которого есть только текстовая категория
+
+    Посты обходятся пакетами по id. Название ищется среди существующих категорий
+    без учета регистра, недостающие категории создаются. В конце проверяется,
+    что постов с текстовой категорией без ссылки не осталось.
+    """
+    Post = apps.get_model('wordflow', 'Post')
+    Category = apps.get_model('wordflow', 'Category')
+    max_length = Category._meta.get_field('name').max_length
+    by_name = {category.name.casefold(): category for category in Category.objects.all()}
+
+    last_id = 0
+    while True:
+        batch = list(
+            Post.objects.filter(id__gt=last_id, category_obj__isnull=True)
+            .order_by('id').only('id', 'category')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed = []
+        for post in batch:
+            name = (post.category or '').strip()[:max_length]
+            if not name:
+                continue
+            category = by_name.get(name.casefold())
+            if category is None:
+                category = by_name[name.casefold()] = Category.objects.create(name=name)
+            post.category_obj = category
+            changed.append(post)
+        Post.objects.bulk_update(changed, ['category_obj'])
+
+    unresolved = [
+        post_id for post_id, name in Post.objects.filter(category_obj__isnull=True)
+        .exclude(category='').values_list('id', 'category')
+        if name.strip()
+    ]
+    if unresolved:
+        raise RuntimeError(f'Посты без категории после переноса: {unresolved[:20]}')
+
+
+def restore_category_text(apps, schema_editor):
+    """Заполняет текстовое поле названием категории для отката"""
+    Post = apps.get_model('wordflow', 'Post')
+    Category = apps.get_model('wordflow', 'Category')
+    for category in Category.objects.all():
+        Post.objects.filter(category_obj=category).update(category=category.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0039_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_category_obj, restore_category_text),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Удаление текстовой категории отдельной миграцией: на PostgreSQL ALTER TABLE
+    нельзя выполнять в транзакции с отложенными проверками ключей после переноса
+    """
+
+    dependencies = [
+        ('wordflow', '0040_backfill_post_category_obj'),
+    ]
+
+    operations = [
+        # Значение по умолчанию нужно для отката: колонка создается заново у существующих строк
+        migrations.AlterField(
+            model_name='post',
+            name='category',
+            field=models.CharField(blank=True, default='', help_text='Временное текстовое поле для категории', max_length=100, verbose_name='Категория (текст)'),
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='category',
+        ),
+    ]
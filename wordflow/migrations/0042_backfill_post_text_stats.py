@@ -0,0 +1,98 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:40
+
+import math
+import re
+from html.parser import HTMLParser
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Алгоритм wordflow.html_text на момент миграции: код приложения может измениться
+POST_EXCERPT_LENGTH = 500
+READING_WORDS_PER_MINUTE = 200
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+))
+SKIPPED_TAGS = frozenset(('script', 'style', 'template', 'noscript'))
+WHITESPACE_RE = re.compile(r'\s+')
+WORD_RE = re.compile(r'\w+')
+
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def _text_stats(content):
+    extractor = _TextExtractor()
+    extractor.feed(content or '')
+    extractor.close()
+    text = WHITESPACE_RE.sub(' ', ''.join(extractor.parts)).strip()
+    word_count = len(WORD_RE.findall(text))
+    reading_time = math.ceil(word_count / READING_WORDS_PER_MINUTE) if word_count else 0
+    excerpt = text
+    if len(text) > POST_EXCERPT_LENGTH:
+        cut = text[:POST_EXCERPT_LENGTH - 1]
+        if ' ' in cut:
+            cut = cut.rsplit(' ', 1)[0]
+        excerpt = cut.rstrip(' ,.;:-') + '…'
+    return excerpt, word_count, reading_time
+
+
+def backfill_text_stats(apps, schema_editor):
+    """
+    Заполняет отрывок, количество слов и время чтения постов, созданных до 0034
+
+    Посты обходятся пакетами по id; карточки получают новую версию,
+    чтобы закешированные карточки без отрывка не показывались.
+    """
+    Post = apps.get_model('wordflow', 'Post')
+    last_id = 0
+    while True:
+        batch = list(
+            Post.objects.filter(id__gt=last_id, excerpt='').order_by('id')
+            .only('id', 'content', 'card_version')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for post in batch:
+            post.excerpt, post.word_count, post.reading_time = _text_stats(post.content)
+            post.card_version += 1
+        Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time', 'card_version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordflow', '0041_remove_post_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_text_stats, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,15 @@
-from django.db import models
+import os
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from ckeditor.fields import RichTextField
 from .constants import (
-    DEFAULT_LIKES, DEFAULT_VIEWS, MAX_POST_NAME_LENGTH,
-    MAX_CATEGORY_NAME_LENGTH, MAX_COMMENT_LENGTH, MAX_DELETED_MESSAGE_LENGTH
+    DEFAULT_LIKES, DEFAULT_VIEWS, DEFAULT_COMMENTS, MAX_POST_NAME_LENGTH,
+    MAX_COMMENT_LENGTH, MAX_DELETED_MESSAGE_LENGTH,
+    MAX_SEARCH_TERM_LENGTH, POST_EXCERPT_LENGTH
 )
+from .storage import post_image_storage
 
 
 def get_current_time_str():
@@ -27,6 +30,40 @@ class Category(models.Model):
         return self.name
 
 
+# Поля поста, вычисляемые из содержания
+TEXT_STATS_FIELDS = ('excerpt', 'word_count', 'reading_time')
+
+# Поля поста, которые меняются только атомарными UPDATE (F-выражения)
+ATOMIC_POST_FIELDS = ('views', 'likes', 'comments_count', 'hot_score', 'card_version')
+
+
+# Поля, которые не выводятся в карточках поста
+CARD_DEFERRED_FIELDS = ('content', 'user__password')
+
+
+class PostQuerySet(models.QuerySet):
+    def for_cards(self, user=None):
+        """
+        Проекция для карточек: тяжелые колонки отложены, автор и категория
+        присоединены, для авторизованного пользователя добавлен признак is_liked
+
+        Страница карточек загружается одним запросом.
+        """
+        queryset = self.select_related('user', 'category_obj').defer(*CARD_DEFERRED_FIELDS)
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(is_liked=models.Exists(
+                PostLike.objects.filter(post_id=models.OuterRef('pk'), user_id=user.id)
+            ))
+        return queryset
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    """Менеджер по умолчанию: посты, помеченные удаленными, не видны"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     """Модель поста блога"""
     postname = models.CharField(
@@ -34,11 +71,6 @@ class Post(models.Model):
         verbose_name=_("Название поста"),
         help_text=_("Введите название поста")
     )
-    category = models.CharField(
-        max_length=MAX_CATEGORY_NAME_LENGTH,
-        verbose_name=_("Категория (текст)"),
-        help_text=_("Временное текстовое поле для категории")
-    )
     category_obj = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -49,13 +81,35 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='images/posts',
+        storage=post_image_storage,
         verbose_name=_("Изображение"),
         help_text=_("Загрузите изображение для поста")
     )
+    image_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("Уменьшенные копии изображения"),
+        help_text=_("Пути копий по ключам вида webp_400; создаются при загрузке")
+    )
     content = RichTextField(
         verbose_name=_("Содержание"),
         help_text=_("Введите содержание поста")
     )
+    excerpt = models.CharField(
+        max_length=POST_EXCERPT_LENGTH,
+        blank=True,
+        default='',
+        verbose_name=_("Отрывок"),
+        help_text=_("Начало текста без разметки; вычисляется при сохранении")
+    )
+    word_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Количество слов")
+    )
+    reading_time = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Время чтения (мин)")
+    )
     time = models.CharField(
         default=get_current_time_str,
         max_length=100,
@@ -70,6 +124,27 @@ class Post(models.Model):
         default=DEFAULT_VIEWS,
         verbose_name=_("Количество просмотров")
     )
+    comments_count = models.IntegerField(
+        default=DEFAULT_COMMENTS,
+        verbose_name=_("Количество комментариев"),
+        help_text=_("Поддерживается сигналами модели Comment")
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name=_("Создан")
+    )
+    hot_score = models.FloatField(
+        default=0.0,
+        editable=False,
+        verbose_name=_("Оценка «в тренде»"),
+        help_text=_("Активность с затуханием по возрасту; обновляется вместе со счетчиками")
+    )
+    card_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Версия карточки"),
+        help_text=_("Увеличивается при правке, лайке и комментарии; входит в ключ кеша карточки")
+    )
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -96,6 +171,16 @@ class Post(models.Model):
         related_name='liked_posts',
         verbose_name=_("Поставили лайк")
     )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Удален"),
+        help_text=_("Пост помечен удаленным и ждет окончательного удаления")
+    )
+
+    objects = PostManager()
+    # Все посты, включая помеченные удаленными
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = _("Пост")
@@ -103,32 +188,125 @@ class Post(models.Model):
         ordering = ['-id']
         indexes = [
             models.Index(fields=['-id']),
-            models.Index(fields=['user']),
-            models.Index(fields=['category_obj']),
+            # Превью постов автора: user_id = ? ORDER BY id DESC
+            models.Index(fields=['user', '-id']),
+            # Лента по сортировкам: ORDER BY <счетчик> DESC, id DESC
+            models.Index(fields=['-comments_count', '-id']),
+            models.Index(fields=['-likes', '-id']),
+            models.Index(fields=['-views', '-id']),
+            models.Index(fields=['-hot_score', '-id']),
+            # Лента категории по каждой сортировке
+            models.Index(fields=['category_obj', '-id']),
+            models.Index(fields=['category_obj', '-comments_count', '-id']),
+            models.Index(fields=['category_obj', '-likes', '-id']),
+            models.Index(fields=['category_obj', '-views', '-id']),
+            models.Index(fields=['category_obj', '-hot_score', '-id']),
+            # Только помеченные удаленными: полный индекс по deleted_at планировщик
+            # выбирал бы для deleted_at IS NULL вместо индексов сортировки
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='wordflow_post_tombstoned_idx'
+            ),
         ]
 
     def __str__(self):
         return str(self.postname)
 
-    def add_view(self, user):
-        """Добавляет просмотр от пользователя"""
-        if not self.viewed_by.filter(id=user.id).exists():
+    def save(self, *args, **kwargs):
+        """Обрабатывает содержание и пересчитывает текстовые метрики, если оно сохраняется"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Отложенное (defer) содержание не загружаем только ради пересчета
+            content_saved = 'content' not in self.get_deferred_fields()
+        else:
+            content_saved = 'content' in update_fields
+        if content_saved:
+            from .resize import rewrite_content_images
+            self.content = rewrite_content_images(self.content)
+            self.update_text_stats()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(TEXT_STATS_FIELDS)
+        if self._state.adding:
+            from .trending import compute_hot_score
+            self.hot_score = compute_hot_score(self.likes, self.views, self.comments_count, self.created_at)
+        # Новый файл еще не записан в хранилище до сохранения модели
+        image_uploaded = bool(self.image) and not self.image._committed
+        previous_image = None
+        if image_uploaded and self.pk:
+            previous_image = Post.objects.filter(pk=self.pk).values_list('image', flat=True).first()
+        if image_uploaded:
+            # Оригинал отдается как запасной <img src>, поэтому тоже хранится без EXIF
+            from .images import strip_original
+            stripped = strip_original(self.image)
+            if stripped is not None:
+                self.image.save(os.path.basename(self.image.name), stripped, save=False)
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Полное сохранение загруженного ранее объекта не должно вернуть прежние
+            # значения счетчиков и версии карточки поверх параллельных UPDATE
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ATOMIC_POST_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        if image_uploaded:
+            # Ссылка на прежний файл больше не нужна; при повторной загрузке того же
+            # содержимого это просто возвращает счетчик ссылок к прежнему значению.
+            # После отката транзакции строка снова ссылается на прежний файл, поэтому
+            # ссылка освобождается только после фиксации
+            if previous_image:
+                storage = self.image.storage
+                transaction.on_commit(lambda: storage.delete(previous_image))
+            self.update_image_derivatives()
+
+    def update_text_stats(self):
+        """Вычисляет отрывок, количество слов и время чтения по содержанию"""
+        from .html_text import text_stats
+        self.excerpt, self.word_count, self.reading_time = text_stats(self.content)
+
+    def update_image_derivatives(self):
+        """Создает уменьшенные копии изображения и сохраняет их пути"""
+        from PIL import Image
+        from .images import delete_derivatives, generate_derivatives
+        from .logging_config import post_logger
+        previous = self.image_derivatives or {}
+        try:
+            self.image_derivatives = generate_derivatives(self.image.name)
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            # Без копий карточка покажет оригинал; прежние копии относятся к другому файлу
+            post_logger.warning(f'Не удалось создать копии изображения поста {self.pk}: {error}')
+            self.image_derivatives = {}
+        # Новые копии уже учтены в счетчиках ссылок, прежние освобождаем после фиксации
+        transaction.on_commit(lambda: delete_derivatives(previous))
+        # Карточки могли закешироваться до появления копий - увеличиваем версию
+        Post.objects.filter(pk=self.pk).update(
+            image_derivatives=self.image_derivatives,
+            card_version=models.F('card_version') + 1
+        )
+
+    def add_view(self, user=None):
+        """
+        Добавляет просмотр (от пользователя или анонимный)
+
+        Счетчик обновляется через буфер отложенной записи, строка поста
+        не сохраняется. Возвращает True, если просмотр был засчитан.
+        """
+        from .view_buffer import view_buffer
+        if user is not None and user.is_authenticated:
+            if PostView.objects.filter(post=self, user=user).exists():
+                return False
             PostView.objects.create(post=self, user=user)
-            self.views += 1
-            self.save()
+        view_buffer.add(self.id)
+        self.views += 1
+        return True
     
     def toggle_like(self, user):
         """Переключает лайк от пользователя (добавляет или убирает)"""
-        like_obj, created = PostLike.objects.get_or_create(post=self, user=user)
-        if created:
-            self.likes += 1
-            self.save()
-            return True
-        else:
-            like_obj.delete()
-            self.likes -= 1
-            self.save()
-            return False
+        from .likes import toggle_post_like
+        is_liked, self.likes = toggle_post_like(self, user)
+        return is_liked
     
     def is_liked_by(self, user):
         """Проверяет, поставил ли пользователь лайк этому посту"""
@@ -137,39 +315,26 @@ class Post(models.Model):
         return False
     
     def can_edit(self, user):
-        """Проверяет, может ли пользователь редактировать пост"""
-        if not user.is_authenticated:
-            return False
-        return (user == self.user or 
-                user.is_superuser or 
-                self.editors.filter(id=user.id).exists())
+        """Проверяет, может ли пользователь редактировать пост (автор, редактор или суперпользователь)"""
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_edit(self)
     
     @staticmethod
     def can_create_posts(user):
         """Проверяет, может ли пользователь создавать посты"""
-        if not user.is_authenticated:
-            return False
         # Пользователь может создавать посты если:
         # 1. Он суперпользователь
         # 2. Он является глобальным редактором
         # 3. Он является редактором хотя бы одного поста
         # 4. Он уже создал хотя бы один пост (автор)
-        from .models import GlobalEditor
-        try:
-            is_global_editor = GlobalEditor.objects.filter(user=user, is_active=True).exists()
-        except:
-            is_global_editor = False
-            
-        return (user.is_superuser or 
-                is_global_editor or
-                user.editable_posts.exists() or 
-                user.authored_posts.exists())
+        from .permissions import get_permission_context
+        return get_permission_context(user).can_create_posts
     
     def get_category_name(self):
-        """Возвращает название категории (новая модель или текстовое поле)"""
+        """Возвращает название категории поста"""
         if self.category_obj:
             return self.category_obj.name
-        return self.category or "Без категории"
+        return "Без категории"
 
 
 class PostView(models.Model):
@@ -180,6 +345,8 @@ class PostView(models.Model):
 
     class Meta:
         unique_together = ('post', 'user')
+        # Проверка просмотра и выборки по пользователю: user_id = ? AND post_id ...
+        indexes = [models.Index(fields=['user', 'post'])]
 
     def __str__(self):
         return f"{self.user.username} viewed {self.post.postname}"
@@ -207,6 +374,8 @@ class PostLike(models.Model):
 
     class Meta:
         unique_together = ('post', 'user')
+        # Лайки пользователя на странице: user_id = ? AND post_id IN (...)
+        indexes = [models.Index(fields=['user', 'post'])]
 
     def __str__(self):
         return f"{self.user.username} liked {self.post.postname}"
@@ -270,7 +439,8 @@ class Comment(models.Model):
         verbose_name_plural = _("Комментарии")
         ordering = ['id']
         indexes = [
-            models.Index(fields=['post']),
+            # Ветка комментариев загружается одним запросом post_id = ? ORDER BY id
+            models.Index(fields=['post', 'id']),
             models.Index(fields=['user']),
             models.Index(fields=['parent']),
         ]
@@ -282,16 +452,9 @@ class Comment(models.Model):
     
     def toggle_like(self, user):
         """Переключает лайк от пользователя (добавляет или убирает)"""
-        like_obj, created = CommentLike.objects.get_or_create(comment=self, user=user)
-        if created:
-            self.likes += 1
-            self.save()
-            return True
-        else:
-            like_obj.delete()
-            self.likes -= 1
-            self.save()
-            return False
+        from .likes import toggle_comment_like
+        is_liked, self.likes = toggle_comment_like(self, user)
+        return is_liked
     
     def is_liked_by(self, user):
         """Проверяет, поставил ли пользователь лайк этому комментарию"""
@@ -302,10 +465,18 @@ class Comment(models.Model):
     def soft_delete(self):
         """Мягкое удаление комментария с сообщением об удалении только если есть ответы"""
         if self.replies.exists():
-            self.is_deleted = True
-            self.deleted_message = "Удалено автором"
-            self.content = ""
-            self.save()
+            with transaction.atomic():
+                # Повторный запрос не должен снова уменьшить счетчик поста
+                already_deleted = Comment.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('is_deleted', flat=True).first()
+                if already_deleted is None or already_deleted:
+                    return False
+                self.is_deleted = True
+                self.deleted_message = "Удалено автором"
+                self.content = ""
+                # update_fields с is_deleted сигнализирует об уменьшении счетчика поста
+                self.save(update_fields=['is_deleted', 'deleted_message', 'content'])
             return False
         else:
             self.delete()
@@ -326,6 +497,8 @@ class CommentLike(models.Model):
 
     class Meta:
         unique_together = ('comment', 'user')
+        # Лайки пользователя в ветке: user_id = ? AND comment_id IN (...)
+        indexes = [models.Index(fields=['user', 'comment'])]
 
     def __str__(self):
         return f"{self.user.username} liked comment {self.comment.id}"
@@ -343,4 +516,46 @@ class GlobalEditor(models.Model):
         verbose_name_plural = "Глобальные редакторы"
 
     def __str__(self):
-        return f"Глобальный редактор: {self.user.username}"
\ No newline at end of file
+        return f"Глобальный редактор: {self.user.username}"
+
+
+class PostSearchDocument(models.Model):
+    """Статистика поста в поисковом индексе"""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    length = models.PositiveIntegerField(default=0)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Поисковый документ поста {self.post_id}"
+
+
+class PostSearchTerm(models.Model):
+    """Запись инвертированного индекса: терм поста и его частота"""
+    term = models.CharField(max_length=MAX_SEARCH_TERM_LENGTH)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_terms')
+    frequency = models.PositiveIntegerField()
+    # Длина документа дублируется для расчета BM25 без соединения таблиц
+    doc_length = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return f"{self.term} -> {self.post_id} ({self.frequency})"
+
+
+class MediaBlob(models.Model):
+    """Файл хранилища с адресацией по содержимому и счетчик ссылок на него"""
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
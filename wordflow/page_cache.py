@@ -0,0 +1,129 @@
+"""
+Кеш страниц для анонимных пользователей WordFlow
+
+Ключ страницы включает путь, нормализованные параметры запроса и версии
+данных, от которых страница зависит. Сигналы моделей увеличивают версии,
+поэтому устаревшие страницы перестают находиться в кеше сразу после
+изменения, а не по истечении TTL. Версии хранятся в кеше по умолчанию:
+сброс виден всем воркерам только с общим бэкендом (CACHE_BACKEND); с LocMem
+другие процессы отдают прежние страницы до истечения PAGE_CACHE_TIMEOUT.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from .constants import PAGE_CACHE_TIMEOUT, PAGE_CACHE_QUERY_PARAMS, SORT_FIELDS, SORT_NEWEST
+
+# Списки постов: любые изменения постов, комментариев, лайков и категорий
+LISTING_VERSION_KEY = 'wordflow:page:listing:version'
+# Общие блоки страницы поста (последние посты): создание, правка и удаление постов
+SIDEBAR_VERSION_KEY = 'wordflow:page:sidebar:version'
+POST_VERSION_KEY = 'wordflow:page:post:{}:version'
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # После вытеснения версия не должна повториться, поэтому начинаем со времени
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_listing_pages() -> None:
+    """Сбрасывает кешированные страницы со списками постов"""
+    _bump_version(LISTING_VERSION_KEY)
+
+
+def invalidate_post_sidebar() -> None:
+    """Сбрасывает все страницы постов из-за изменения общих блоков"""
+    _bump_version(SIDEBAR_VERSION_KEY)
+
+
+def invalidate_post_page(post_id: int) -> None:
+    """Сбрасывает кешированную страницу одного поста"""
+    _bump_version(POST_VERSION_KEY.format(post_id))
+
+
+def _normalized_params(request):
+    """Параметры, влияющие на страницу, без значений по умолчанию"""
+    params = []
+    for name in PAGE_CACHE_QUERY_PARAMS:
+        value = request.GET.get(name, '').strip()
+        if name == 'sort' and (value == SORT_NEWEST or value not in SORT_FIELDS):
+            continue
+        if name == 'page' and value == '1':
+            continue
+        if value:
+            params.append((name, value))
+    return params
+
+
+def page_cache_key(request, post_id=None) -> str:
+    """Возвращает ключ страницы для пути и нормализованных параметров запроса"""
+    params = _normalized_params(request)
+    if post_id is None:
+        versions = [_get_version(LISTING_VERSION_KEY)]
+    else:
+        versions = [_get_version(SIDEBAR_VERSION_KEY), _get_version(POST_VERSION_KEY.format(post_id))]
+    raw = f"{request.path}?{urlencode(params)}"
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"wordflow:page:{':'.join(map(str, versions))}:{digest}"
+
+
+def _is_cacheable_request(request) -> bool:
+    if request.method != 'GET' or request.user.is_authenticated:
+        return False
+    # Сообщения предназначены конкретному посетителю (len() их не помечает прочитанными)
+    return not len(messages.get_messages(request))
+
+
+def _is_cacheable_response(request, response) -> bool:
+    if response.status_code != 200 or response.streaming:
+        return False
+    # Страница с CSRF-токеном привязана к cookie конкретного посетителя
+    return not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+
+
+def cache_anonymous_page(post_kwarg=None, on_hit=None):
+    """
+    Кеширует ответ представления для анонимных GET-запросов
+
+    Args:
+        post_kwarg: имя аргумента с id поста для страниц отдельного поста
+            (ключ зависит от версии поста, а не от версии списков)
+        on_hit: функция (request, **kwargs), выполняемая при отдаче из кеша
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, kwargs.get(post_kwarg) if post_kwarg else None)
+            cached = cache.get(key)
+            if cached is not None:
+                if on_hit is not None:
+                    on_hit(request, *args, **kwargs)
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if _is_cacheable_response(request, response):
+                # Сохраняем только тело: cookie ответа принадлежат текущему посетителю
+                cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
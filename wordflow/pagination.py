@@ -0,0 +1,222 @@
+"""
+Пагинация лент постов WordFlow
+
+Keyset (курсорная) пагинация выбирает страницу условием по последней
+увиденной паре (ключ сортировки, id), поэтому переход на следующую
+или предыдущую страницу стоит одинаково на любой глубине.
+CachedCountPaginator кеширует COUNT(*) и для нефильтрованных лент
+может использовать оценку количества строк из статистики базы. Версия
+количеств хранится в кеше по умолчанию, поэтому ее сброс доходит до других
+воркеров только с общим бэкендом (CACHE_BACKEND).
+"""
+
+import base64
+import hashlib
+import json
+from typing import Optional, Tuple
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .constants import POST_COUNT_CACHE_TIMEOUT, APPROXIMATE_COUNT_THRESHOLD
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class CursorPage:
+    """Страница курсорной пагинации с интерфейсом, близким к Page"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорный пагинатор по убыванию (sort_field, id)
+
+    Args:
+        queryset: отфильтрованный queryset (порядок задает пагинатор)
+        per_page: количество объектов на странице
+        sort_field: поле сортировки или None для сортировки только по id
+    """
+
+    def __init__(self, queryset, per_page: int, sort_field: Optional[str] = None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.sort_field = sort_field
+
+    def _key(self, obj) -> Tuple:
+        if self.sort_field:
+            return getattr(obj, self.sort_field), obj.id
+        return None, obj.id
+
+    def encode_cursor(self, obj, direction: str) -> str:
+        """Кодирует позицию объекта в непрозрачную строку для URL"""
+        value, obj_id = self._key(obj)
+        payload = json.dumps([direction, value, obj_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str):
+        """Возвращает (направление, значение, id) или None для некорректного курсора"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, obj_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            return None
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or not isinstance(obj_id, int):
+            return None
+        if self.sort_field and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+            return None
+        return direction, value, obj_id
+
+    def _after(self, value, obj_id) -> Q:
+        """Условие «дальше по списку» для убывающего порядка"""
+        if not self.sort_field:
+            return Q(id__lt=obj_id)
+        return Q(**{f'{self.sort_field}__lt': value}) | Q(**{self.sort_field: value, 'id__lt': obj_id})
+
+    def _before(self, value, obj_id) -> Q:
+        if not self.sort_field:
+            return Q(id__gt=obj_id)
+        return Q(**{f'{self.sort_field}__gt': value}) | Q(**{self.sort_field: value, 'id__gt': obj_id})
+
+    def _ordering(self, descending: bool):
+        prefix = '-' if descending else ''
+        fields = [self.sort_field, 'id'] if self.sort_field else ['id']
+        return [prefix + field for field in fields]
+
+    def get_page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Возвращает страницу после (или перед) позицией курсора"""
+        decoded = self.decode_cursor(cursor) if cursor else None
+
+        if decoded and decoded[0] == CURSOR_PREVIOUS:
+            _, value, obj_id = decoded
+            rows = list(
+                self.queryset.filter(self._before(value, obj_id))
+                .order_by(*self._ordering(descending=False))[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            objects = list(reversed(rows[:self.per_page]))
+            has_previous, has_next = has_more, True
+        else:
+            queryset = self.queryset
+            if decoded:
+                _, value, obj_id = decoded
+                queryset = queryset.filter(self._after(value, obj_id))
+            rows = list(queryset.order_by(*self._ordering(descending=True))[:self.per_page + 1])
+            objects = rows[:self.per_page]
+            has_previous, has_next = decoded is not None, len(rows) > self.per_page
+
+        if not objects:
+            return CursorPage([], self)
+        return CursorPage(
+            objects,
+            self,
+            next_cursor=self.encode_cursor(objects[-1], CURSOR_NEXT) if has_next else None,
+            previous_cursor=self.encode_cursor(objects[0], CURSOR_PREVIOUS) if has_previous else None,
+        )
+
+
+POST_COUNT_VERSION_KEY = 'wordflow:post_count:version'
+
+
+def get_post_count_version() -> int:
+    version = cache.get(POST_COUNT_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(POST_COUNT_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_post_counts() -> None:
+    """Инвалидирует все кешированные количества постов сменой версии"""
+    try:
+        cache.incr(POST_COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(POST_COUNT_VERSION_KEY, 2, None)
+
+
+def estimate_row_count(model) -> Optional[int]:
+    """
+    Возвращает оценку количества строк таблицы из статистики базы
+
+    Поддерживаются PostgreSQL и MySQL; для остальных бэкендов None.
+    """
+    connection = connections[model.objects.db]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        params = [table]
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+        params = [table]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator с кешированием количества объектов
+
+    Args:
+        count_key: ключ ленты (фильтр и сортировка); None отключает кеш
+        approximate: разрешает оценку количества строк для нефильтрованной ленты
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, approximate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.approximate = approximate
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+
+        # Ключ может содержать пользовательский ввод (фильтр), поэтому хешируем его
+        digest = hashlib.md5(self.count_key.encode()).hexdigest()
+        key = f'wordflow:post_count:{get_post_count_version()}:{digest}'
+        total = cache.get(key)
+        if total is None:
+            if self.approximate:
+                estimate = estimate_row_count(self.object_list.model)
+                if estimate is not None and estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                    total = estimate
+            if total is None:
+                total = super().count
+            cache.set(key, total, POST_COUNT_CACHE_TIMEOUT)
+        return total
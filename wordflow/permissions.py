@@ -0,0 +1,120 @@
+"""
+Права пользователя на посты
+
+Индекс прав (флаги автора и глобального редактора, id постов, куда
+пользователь назначен редактором) хранится в кеше между запросами под
+ключом с версией. Сигналы PostEditor, GlobalEditor и авторства постов
+увеличивают версию. Другие воркеры видят ее только с общим бэкендом кеша
+(CACHE_BACKEND); с LocMem индекс живет PERMISSION_LOCAL_CACHE_TIMEOUT,
+и снятый редактор теряет права в других процессах не позже этого срока.
+В рамках запроса контекст прав кешируется на объекте пользователя, поэтому
+повторные проверки не обращаются даже к кешу.
+"""
+
+import time
+from typing import FrozenSet
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from .constants import PERMISSION_CACHE_TIMEOUT, PERMISSION_LOCAL_CACHE_TIMEOUT
+from .utils import cache_is_shared
+
+# Атрибут объекта пользователя, в котором хранится контекст
+PERMISSION_CONTEXT_ATTR = '_wordflow_permissions'
+PERMISSION_CACHE_KEY = 'wordflow:permissions:{}:{}'
+PERMISSION_VERSION_KEY = 'wordflow:permissions:version'
+
+
+def _get_version() -> int:
+    version = cache.get(PERMISSION_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(PERMISSION_VERSION_KEY, version, None):
+            version = cache.get(PERMISSION_VERSION_KEY, version)
+    return version
+
+
+def _build_permission_index(user_id: int) -> dict:
+    # Авторство конкретного поста проверяется по post.user_id, поэтому
+    # в индекс попадают только назначения редактором
+    from .models import GlobalEditor, Post, PostEditor
+    return {
+        'is_author': Post.objects.filter(user_id=user_id).exists(),
+        'is_global_editor': GlobalEditor.objects.filter(user_id=user_id, is_active=True).exists(),
+        'editable_post_ids': frozenset(
+            PostEditor.objects.filter(user_id=user_id).values_list('post_id', flat=True)
+        ),
+    }
+
+
+def get_permission_index(user_id: int) -> dict:
+    """Возвращает закешированный индекс прав пользователя"""
+    key = PERMISSION_CACHE_KEY.format(_get_version(), user_id)
+    index = cache.get(key)
+    if index is None:
+        index = _build_permission_index(user_id)
+        timeout = PERMISSION_CACHE_TIMEOUT if cache_is_shared() else PERMISSION_LOCAL_CACHE_TIMEOUT
+        cache.set(key, index, timeout)
+    return index
+
+
+def invalidate_user_permissions(*user_ids) -> None:
+    """Помечает индексы прав устаревшими (во всех процессах при общем кеше)"""
+    if not any(user_ids):
+        return
+    try:
+        cache.incr(PERMISSION_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMISSION_VERSION_KEY, time.time_ns(), None)
+
+
+class PermissionContext:
+    """Флаги возможностей пользователя и id постов, которые он может редактировать"""
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = user.is_authenticated
+        self.is_superuser = self.is_authenticated and user.is_superuser
+
+    @cached_property
+    def _index(self) -> dict:
+        if not self.is_authenticated:
+            return {'is_author': False, 'is_global_editor': False, 'editable_post_ids': frozenset()}
+        return get_permission_index(self.user.id)
+
+    @property
+    def editable_post_ids(self) -> FrozenSet[int]:
+        """Посты, куда пользователь назначен редактором"""
+        return self._index['editable_post_ids']
+
+    @property
+    def is_author(self) -> bool:
+        return self._index['is_author']
+
+    @property
+    def is_global_editor(self) -> bool:
+        return self._index['is_global_editor']
+
+    @cached_property
+    def can_create_posts(self) -> bool:
+        """Суперпользователь, глобальный редактор, автор или редактор хотя бы одного поста"""
+        if not self.is_authenticated:
+            return False
+        return self.is_superuser or self.is_author or bool(self.editable_post_ids) or self.is_global_editor
+
+    def can_edit(self, post) -> bool:
+        if not self.is_authenticated:
+            return False
+        return (
+            self.is_superuser or
+            post.user_id == self.user.id or
+            post.id in self.editable_post_ids
+        )
+
+
+def get_permission_context(user) -> PermissionContext:
+    """Возвращает контекст прав, созданный для этого объекта пользователя"""
+    context = getattr(user, PERMISSION_CONTEXT_ATTR, None)
+    if context is None:
+        context = PermissionContext(user)
+        setattr(user, PERMISSION_CONTEXT_ATTR, context)
+    return context
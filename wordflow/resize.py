@@ -0,0 +1,205 @@
+"""
+Изменение размера изображений из содержимого постов WordFlow
+
+Картинки, загруженные через CKEditor, отдаются уменьшенными копиями по
+запросу. Копия адресуется хешем (файл-источник, его размер и время
+изменения, ширина, формат) и хранится в дисковом кеше в MEDIA_ROOT, поэтому
+повторные запросы не обращаются к Pillow. Параллельные промахи по одному
+ключу ждут друг друга на блокировке и рендерят копию один раз. Адрес копии
+содержит версию источника (v), поэтому после замены файла меняется и адрес.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from html import unescape
+from urllib.parse import unquote, urlencode, urlparse
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape
+from PIL import Image, ImageOps
+from .constants import (
+    ALLOWED_IMAGE_EXTENSIONS, IMAGE_RESIZE_WIDTHS, IMAGE_RESIZE_FORMATS,
+    IMAGE_RESIZE_CACHE_DIR, CONTENT_IMAGE_DEFAULT_WIDTH, CONTENT_IMAGE_SIZES
+)
+from .images import FORMAT_OPTIONS, prepare_mode
+
+try:
+    import fcntl
+except ImportError:  # Windows: остается блокировка внутри процесса
+    fcntl = None
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+# Блокировки внутри процесса, распределенные по ключам
+_LOCKS = [threading.Lock() for _ in range(64)]
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+SRC_ATTR_RE = re.compile(r'\ssrc\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+ORIGINAL_SRC_ATTR = 'data-original-src'
+
+
+def _upload_root() -> str:
+    return os.path.realpath(os.path.join(settings.MEDIA_ROOT, settings.CKEDITOR_UPLOAD_PATH))
+
+
+def validate_resize_request(src: str, width, fmt: str):
+    """
+    Проверяет параметры запроса по спискам разрешенных значений
+
+    Returns:
+        (абсолютный путь источника, ширина, формат)
+    Raises:
+        ValueError: параметры не разрешены или источник не найден
+    """
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        raise ValueError('Некорректная ширина')
+    if width not in IMAGE_RESIZE_WIDTHS:
+        raise ValueError('Ширина не разрешена')
+    if fmt not in IMAGE_RESIZE_FORMATS:
+        raise ValueError('Формат не разрешен')
+
+    extension = os.path.splitext(src)[1].lower().lstrip('.')
+    if extension not in ALLOWED_IMAGE_EXTENSIONS:
+        raise ValueError('Тип файла не разрешен')
+    # realpath раскрывает «..» и символические ссылки
+    root = _upload_root()
+    path = os.path.realpath(os.path.join(settings.MEDIA_ROOT, src))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        raise ValueError('Источник не найден')
+    return path, width, fmt
+
+
+def source_version(path: str) -> str:
+    """Короткая версия файла-источника по размеру и времени изменения"""
+    stat = os.stat(path)
+    return hashlib.sha256(f'{stat.st_size}|{stat.st_mtime_ns}'.encode()).hexdigest()[:12]
+
+
+def _cache_key(path: str, width: int, fmt: str) -> str:
+    stat = os.stat(path)
+    raw = f'{path}|{stat.st_size}|{stat.st_mtime_ns}|{width}|{fmt}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _cache_path(key: str, fmt: str) -> str:
+    extension = FORMAT_OPTIONS[fmt][1]
+    return os.path.join(settings.MEDIA_ROOT, IMAGE_RESIZE_CACHE_DIR, key[:2], f'{key}.{extension}')
+
+
+@contextmanager
+def _key_lock(key: str, lock_path: str):
+    """Блокировка ключа внутри процесса и, где возможно, между процессами"""
+    with _LOCKS[int(key[:8], 16) % len(_LOCKS)]:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _render(source: str, target: str, width: int, fmt: str) -> None:
+    with Image.open(source) as image:
+        image.seek(0)
+        image = ImageOps.exif_transpose(image)
+        # Не увеличиваем: узкий источник сохраняется в своей ширине
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        pil_format, _, options = FORMAT_OPTIONS[fmt]
+        # Пишем во временный файл и переименовываем: читатели не увидят половину файла
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                prepare_mode(image, fmt).save(output, pil_format, **options)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def get_resized_image(source: str, width: int, fmt: str):
+    """Возвращает (путь к копии в кеше, ключ), создавая копию при промахе"""
+    key = _cache_key(source, width, fmt)
+    target = _cache_path(key, fmt)
+    if os.path.exists(target):
+        return target, key
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with _key_lock(key, target + '.lock'):
+        # Пока ждали блокировку, копию мог создать другой запрос
+        if not os.path.exists(target):
+            try:
+                _render(source, target, width, fmt)
+            except Image.DecompressionBombError as error:
+                raise ValueError('Слишком большое изображение') from error
+    return target, key
+
+
+def resize_url(name: str, width: int, fmt: str, version: str = None) -> str:
+    params = {'src': name, 'w': width, 'fmt': fmt}
+    if version:
+        params['v'] = version
+    return f"{reverse('resize_image')}?{urlencode(params)}"
+
+
+def _upload_name(src: str):
+    """Возвращает имя файла в MEDIA_ROOT для картинки из загрузок CKEditor или None"""
+    parsed = urlparse(src)
+    if parsed.scheme or parsed.netloc:
+        return None
+    path = unquote(parsed.path).lstrip('/')
+    media_prefix = settings.MEDIA_URL.lstrip('/')
+    if not path.startswith(media_prefix + settings.CKEDITOR_UPLOAD_PATH):
+        return None
+    return path[len(media_prefix):]
+
+
+def _rewrite_tag(match) -> str:
+    tag = match.group(0)
+    if ORIGINAL_SRC_ATTR in tag or 'srcset' in tag.lower():
+        return tag
+    src_match = SRC_ATTR_RE.search(tag)
+    if not src_match:
+        return tag
+    src = unescape(src_match.group(2))
+    name = _upload_name(src)
+    if name is None:
+        return tag
+    try:
+        version = source_version(os.path.join(settings.MEDIA_ROOT, name))
+    except OSError:
+        version = None
+
+    srcset = ', '.join(
+        f'{resize_url(name, width, "jpeg", version)} {width}w' for width in IMAGE_RESIZE_WIDTHS
+    )
+    attrs = (
+        f' src="{escape(resize_url(name, CONTENT_IMAGE_DEFAULT_WIDTH, "jpeg", version))}"'
+        f' srcset="{escape(srcset)}" sizes="{CONTENT_IMAGE_SIZES}"'
+        # Значение могло стоять в одинарных кавычках и содержать двойные
+        f' {ORIGINAL_SRC_ATTR}="{escape(src)}"'
+    )
+    return tag[:src_match.start()] + attrs + tag[src_match.end():]
+
+
+def rewrite_content_images(content: str) -> str:
+    """
+    Направляет <img> из загрузок CKEditor на уменьшенные копии
+
+    Исходный адрес сохраняется в data-original-src, поэтому повторная
+    обработка того же содержимого ничего не меняет.
+    """
+    if not content or '<img' not in content.lower():
+        return content
+    return IMG_TAG_RE.sub(_rewrite_tag, content)
@@ -0,0 +1,120 @@
+"""
+Полнотекстовый поиск по постам WordFlow
+
+Инвертированный индекс хранится в таблице PostSearchTerm (терм, пост,
+частота) и обновляется при сохранении поста. Ранжирование по BM25
+выполняется одним агрегирующим запросом по индексу термов.
+"""
+
+import math
+from typing import Dict, List
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+from .constants import (
+    SEARCH_TITLE_WEIGHT, MAX_SEARCH_TERM_LENGTH, MAX_SEARCH_QUERY_TERMS,
+    BM25_K1, BM25_B, SEARCH_STATS_CACHE_TIMEOUT
+)
+from .models import Post, PostSearchDocument, PostSearchTerm
+from .stemmer import analyze_post, tokenize
+
+SEARCH_STATS_CACHE_KEY = 'wordflow:search:stats'
+
+
+def build_index_rows(post_id: int, frequencies: Dict[str, int]):
+    """Возвращает (документ, записи индекса) для частот термов поста"""
+    frequencies = {term[:MAX_SEARCH_TERM_LENGTH]: count for term, count in frequencies.items()}
+    length = sum(frequencies.values())
+    document = PostSearchDocument(post_id=post_id, length=length)
+    terms = [
+        PostSearchTerm(term=term, post_id=post_id, frequency=count, doc_length=length)
+        for term, count in frequencies.items()
+    ]
+    return document, terms
+
+
+def index_post(post: Post) -> None:
+    """Переиндексирует один пост"""
+    frequencies = analyze_post(post.postname, post.content, SEARCH_TITLE_WEIGHT)
+    document, terms = build_index_rows(post.id, frequencies)
+    with transaction.atomic():
+        PostSearchTerm.objects.filter(post_id=post.id).delete()
+        PostSearchTerm.objects.bulk_create(terms)
+        PostSearchDocument.objects.update_or_create(
+            post_id=post.id, defaults={'length': document.length}
+        )
+    invalidate_index_stats()
+
+
+def invalidate_index_stats() -> None:
+    """Сбрасывает кешированную статистику индекса"""
+    cache.delete(SEARCH_STATS_CACHE_KEY)
+
+
+def get_index_stats():
+    """Возвращает (количество документов, средняя длина документа)"""
+    stats = cache.get(SEARCH_STATS_CACHE_KEY)
+    if stats is None:
+        aggregate = PostSearchDocument.objects.aggregate(total=Count('post'), avg_length=Avg('length'))
+        stats = (aggregate['total'], aggregate['avg_length'] or 0.0)
+        cache.set(SEARCH_STATS_CACHE_KEY, stats, SEARCH_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def parse_query(query: str) -> List[str]:
+    """Возвращает уникальные термы поискового запроса"""
+    terms = []
+    for term in tokenize(query):
+        term = term[:MAX_SEARCH_TERM_LENGTH]
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_SEARCH_QUERY_TERMS]
+
+
+def search_posts(query: str):
+    """
+    Возвращает queryset словарей {'post_id', 'score'}, упорядоченный по BM25
+
+    Результат можно передавать в Paginator: выборка страницы
+    выполняется в базе через LIMIT/OFFSET.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return PostSearchTerm.objects.none()
+
+    total_docs, avg_length = get_index_stats()
+    document_frequency = dict(
+        PostSearchTerm.objects.filter(term__in=terms)
+        .order_by()
+        .values('term')
+        .annotate(df=Count('post'))
+        .values_list('term', 'df')
+    )
+    if not document_frequency:
+        return PostSearchTerm.objects.none()
+
+    idf = {
+        term: _idf(total_docs, df) for term, df in document_frequency.items()
+    }
+    term_weight = Case(
+        *[When(term=term, then=Value(weight)) for term, weight in idf.items()],
+        output_field=FloatField(),
+    )
+    length_norm = BM25_K1 * BM25_B / avg_length if avg_length else 0.0
+    score = ExpressionWrapper(
+        term_weight * F('frequency') * Value(BM25_K1 + 1)
+        / (F('frequency') + Value(BM25_K1 * (1 - BM25_B)) + Value(length_norm) * F('doc_length')),
+        output_field=FloatField(),
+    )
+    return (
+        PostSearchTerm.objects.filter(term__in=list(idf))
+        .order_by()
+        .values('post_id')
+        .annotate(score=Sum(score))
+        .order_by('-score', '-post_id')
+    )
+
+
+def _idf(total_docs: int, df: int) -> float:
+    """Обратная документная частота BM25 (неотрицательный вариант)"""
+    return math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
@@ -0,0 +1,161 @@
+"""
+Сигналы приложения WordFlow
+
+Поддерживают денормализованные счетчики и версии карточек постов
+в актуальном состоянии атомарными UPDATE-запросами без загрузки строк.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import ATOMIC_POST_FIELDS, Post, Comment, PostLike, CommentLike, Category, PostEditor, GlobalEditor
+from . import search
+from .images import delete_derivatives
+from .trending import hot_score_update
+from .pagination import invalidate_post_counts
+from .categories import invalidate_categories
+from .page_cache import invalidate_listing_pages, invalidate_post_page, invalidate_post_sidebar
+from .permissions import invalidate_user_permissions
+
+# Поля поста, изменение которых требует переиндексации
+SEARCH_INDEXED_FIELDS = {'postname', 'content'}
+
+
+# Поля поста, которые не отображаются в карточке
+CARD_IGNORED_FIELDS = {'views', 'comments_count', 'likes', 'card_version'}
+
+
+def _change_comments_count(post_id, delta):
+    """Атомарно изменяет счетчик комментариев поста, его оценку и версию карточки"""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta,
+        hot_score=hot_score_update(comments_count=delta),
+        card_version=F('card_version') + 1
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Увеличивает счетчик при создании и уменьшает при мягком удалении"""
+    if created:
+        if not instance.is_deleted:
+            _change_comments_count(instance.post_id, 1)
+    elif update_fields and 'is_deleted' in update_fields and instance.is_deleted:
+        _change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчик при физическом удалении (включая каскадное)"""
+    if not instance.is_deleted:
+        _change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Обновляет поисковый индекс и сбрасывает кешированные количества постов"""
+    if raw:
+        return
+    if update_fields is None or SEARCH_INDEXED_FIELDS & set(update_fields):
+        search.index_post(instance)
+    # Полное сохранение может сменить категорию, а значит и количество в фильтрах
+    if created or update_fields is None or 'category_obj' in update_fields:
+        invalidate_post_counts()
+        invalidate_categories()
+    if not created and (update_fields is None or set(update_fields) - CARD_IGNORED_FIELDS):
+        Post.all_objects.filter(pk=instance.pk).update(card_version=F('card_version') + 1)
+        # Объект должен видеть новую версию карточки и текущие счетчики
+        instance.refresh_from_db(fields=ATOMIC_POST_FIELDS)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Записи индекса удаляются каскадно, сбрасываем статистику и количества"""
+    search.invalidate_index_stats()
+    invalidate_post_counts()
+    invalidate_categories()
+    transaction.on_commit(lambda: _release_post_images(instance))
+
+
+def _release_post_images(post):
+    """Освобождает ссылки удаленного поста на файлы изображения и его копий"""
+    if post.image:
+        post.image.storage.delete(post.image.name)
+    delete_derivatives(post.image_derivatives or {})
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed_pages(sender, instance, raw=False, **kwargs):
+    """Сбрасывает кешированные страницы, показывающие пост"""
+    if raw:
+        return
+    invalidate_listing_pages()
+    invalidate_post_sidebar()
+    invalidate_post_page(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=PostLike)
+@receiver(post_delete, sender=PostLike)
+def post_activity_changed_pages(sender, instance, raw=False, **kwargs):
+    """Комментарии и лайки меняют счетчики в списках и страницу своего поста"""
+    if raw:
+        return
+    invalidate_listing_pages()
+    invalidate_post_page(instance.post_id)
+
+
+@receiver(post_save, sender=CommentLike)
+@receiver(post_delete, sender=CommentLike)
+def comment_like_changed_pages(sender, instance, raw=False, **kwargs):
+    """Лайки комментариев видны только на странице поста"""
+    if raw:
+        return
+    post_id = Comment.objects.filter(pk=instance.comment_id).values_list('post_id', flat=True).first()
+    # При каскадном удалении комментария страницу сбросит сигнал самого комментария
+    if post_id is not None:
+        invalidate_post_page(post_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed_pages(sender, instance, raw=False, **kwargs):
+    """Категории выводятся в фильтре списков и в карточках постов"""
+    if raw:
+        return
+    invalidate_categories()
+    # Название категории входит в закешированные карточки ее постов
+    if kwargs.get('signal') is post_save:
+        Post.all_objects.filter(category_obj=instance).update(card_version=F('card_version') + 1)
+    invalidate_listing_pages()
+    invalidate_post_sidebar()
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    """Посты удаляемой категории останутся без нее (SET_NULL без сигналов) - обновляем карточки"""
+    Post.all_objects.filter(category_obj=instance).update(card_version=F('card_version') + 1)
+
+
+@receiver(post_save, sender=PostEditor)
+@receiver(post_delete, sender=PostEditor)
+@receiver(post_save, sender=GlobalEditor)
+@receiver(post_delete, sender=GlobalEditor)
+def editor_changed(sender, instance, raw=False, **kwargs):
+    """Назначение и снятие редакторов меняет права пользователя"""
+    if raw:
+        return
+    invalidate_user_permissions(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_author_changed(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    """Новый или удаленный пост меняет список редактируемых постов автора"""
+    if raw:
+        return
+    if created or update_fields is None or 'user' in update_fields:
+        invalidate_user_permissions(instance.user_id)
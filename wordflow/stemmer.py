@@ -0,0 +1,197 @@
+"""
+Токенизация и стемминг текста для поиска WordFlow
+
+Реализация алгоритма Snowball для русского языка без внешних
+зависимостей. Модуль не обращается к Django ORM, поэтому его функции
+можно выполнять в дочерних процессах при параллельной индексации.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List
+from .html_text import html_to_text
+
+TOKEN_RE = re.compile(r'[0-9a-zа-я]+')
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым',
+    'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют',
+     'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил',
+     'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт',
+     'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией',
+    'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах',
+    'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то', 'все',
+    'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же', 'вы', 'за', 'бы', 'по',
+    'только', 'ее', 'мне', 'было', 'вот', 'от', 'меня', 'еще', 'нет', 'о', 'из',
+    'ему', 'когда', 'даже', 'ну', 'ли', 'если', 'уже', 'или', 'ни', 'быть', 'был',
+    'него', 'до', 'вас', 'уж', 'вам', 'ведь', 'там', 'себя', 'ей', 'они', 'тут',
+    'где', 'есть', 'надо', 'ней', 'для', 'мы', 'тебя', 'их', 'чем', 'была', 'сам',
+    'без', 'чего', 'раз', 'тоже', 'себе', 'под', 'будет', 'ж', 'тогда', 'кто',
+    'этот', 'того', 'потому', 'этого', 'какой', 'ним', 'здесь', 'этом', 'мой',
+    'тем', 'чтобы', 'нее', 'были', 'можно', 'при', 'об', 'после', 'над', 'тот',
+    'через', 'эти', 'нас', 'про', 'них', 'эту', 'моя', 'этой', 'перед', 'том',
+    'такой', 'им', 'более', 'между',
+    'the', 'a', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'is', 'it', 'for', 'with',
+))
+
+
+def _sorted(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+def _sorted_groups(groups):
+    # (окончание, требуется ли перед ним «а»/«я»), длинные окончания первыми
+    pairs = [(ending, True) for ending in groups[0]] + [(ending, False) for ending in groups[1]]
+    return tuple(sorted(pairs, key=lambda pair: len(pair[0]), reverse=True))
+
+
+_PERFECTIVE_GERUND = _sorted_groups(PERFECTIVE_GERUND)
+_PARTICIPLE = _sorted_groups(PARTICIPLE)
+_VERB = _sorted_groups(VERB)
+_ADJECTIVE = _sorted(ADJECTIVE)
+_REFLEXIVE = _sorted(REFLEXIVE)
+_NOUN = _sorted(NOUN)
+_SUPERLATIVE = _sorted(SUPERLATIVE)
+_DERIVATIONAL = _sorted(DERIVATIONAL)
+
+
+def _strip_grouped(rv: str, endings) -> str:
+    """
+    Удаляет самое длинное подходящее окончание из группы
+
+    Возвращает None, если окончание не найдено или не выполнено условие
+    о предшествующей «а»/«я» (как в конструкции among алгоритма Snowball).
+    """
+    for ending, needs_a in endings:
+        if rv.endswith(ending):
+            stem = rv[:-len(ending)]
+            if needs_a and not stem.endswith(('а', 'я')):
+                return None
+            return stem
+    return None
+
+
+def _strip(rv: str, endings) -> str:
+    for ending in endings:
+        if rv.endswith(ending):
+            return rv[:-len(ending)]
+    return None
+
+
+def _regions(word: str):
+    """Возвращает начала областей RV и R2"""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def stem(word: str) -> str:
+    """Возвращает основу русского слова по алгоритму Snowball"""
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    stemmed = _strip_grouped(rv, _PERFECTIVE_GERUND)
+    if stemmed is None:
+        reflexive = _strip(rv, _REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        adjectival = _strip(rv, _ADJECTIVE)
+        if adjectival is not None:
+            participle = _strip_grouped(adjectival, _PARTICIPLE)
+            stemmed = participle if participle is not None else adjectival
+        else:
+            stemmed = _strip_grouped(rv, _VERB)
+            if stemmed is None:
+                stemmed = _strip(rv, _NOUN)
+    rv = stemmed if stemmed is not None else rv
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание целиком в R2
+    for ending in _DERIVATIONAL:
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, _SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на нормализованные термы (без стоп-слов)"""
+    terms = []
+    for token in TOKEN_RE.findall((text or '').lower().replace('ё', 'е')):
+        if token in STOP_WORDS:
+            continue
+        terms.append(stem(token) if token[0] >= 'а' else token)
+    return terms
+
+
+def analyze_post(postname: str, content: str, title_weight: int) -> Dict[str, int]:
+    """
+    Возвращает частоты термов поста
+
+    Термы заголовка учитываются с весом ``title_weight``.
+    """
+    frequencies = Counter(tokenize(html_to_text(content)))
+    for term in tokenize(postname):
+        frequencies[term] += title_weight
+    return frequencies
+
+
+def analyze_rows(rows: Iterable, title_weight: int) -> List:
+    """Анализирует строки (id, postname, content); используется пулом процессов"""
+    return [
+        (post_id, analyze_post(postname, content, title_weight))
+        for post_id, postname, content in rows
+    ]
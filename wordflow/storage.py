@@ -0,0 +1,109 @@
+"""
+Хранилище изображений постов с адресацией по содержимому
+
+Файл хешируется (SHA-256) во время потоковой записи на диск и хранится
+один раз под именем <каталог>/<aa>/<хеш><расширение>. Повторная загрузка
+того же содержимого не занимает места: увеличивается счетчик ссылок
+в MediaBlob, а файл удаляется с диска, когда ссылок не остается.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[0-9a-z]+$')
+
+
+def blob_name(directory: str, digest: str, extension: str) -> str:
+    """Имя файла в хранилище для содержимого с данным хешем"""
+    return f'{directory}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+def is_blob_name(name: str) -> bool:
+    """Проверяет, что имя файла - хеш содержимого"""
+    return bool(BLOB_NAME_RE.match(os.path.basename(name)))
+
+
+def file_digest(path: str, chunk_size: int = 64 * 1024) -> str:
+    """Хеш SHA-256 файла на диске"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def add_reference(name: str, digest: str, size: int, count: int = 1) -> None:
+    """Увеличивает счетчик ссылок файла, создавая запись при первой ссылке"""
+    from .models import MediaBlob
+    if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + count):
+        return
+    blob, created = MediaBlob.objects.get_or_create(
+        name=name, defaults={'digest': digest, 'size': size, 'ref_count': count}
+    )
+    if not created:
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + count)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла определяется его содержимым"""
+
+    def get_available_name(self, name, max_length=None):
+        # Имя вычисляется в _save по хешу, одинаковое содержимое не переименовываем
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1]
+        tmp_dir = self.path(directory)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        sha, size = hashlib.sha256(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    size += len(chunk)
+                    output.write(chunk)
+
+            digest = sha.hexdigest()
+            final_name = blob_name(directory, digest, extension)
+            full_path = self.path(final_name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            # Ссылка учитывается до появления файла: параллельное удаление
+            # последней ссылки ждет блокировку строки и не удалит новый файл
+            with transaction.atomic():
+                add_reference(final_name, digest, size)
+                if not os.path.exists(full_path):
+                    os.replace(tmp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return final_name
+
+    def delete(self, name):
+        """Уменьшает счетчик ссылок; файл удаляется вместе с последней ссылкой"""
+        from .models import MediaBlob
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Файл без записи загружен до хранилища, и на него могут
+                # ссылаться другие строки - оставляем его на диске
+                return
+            if blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+            super().delete(name)
+
+
+post_image_storage = ContentAddressedStorage()
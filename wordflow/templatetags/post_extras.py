@@ -1,7 +1,8 @@
 from django import template
-from ..models import Comment
-from ..constants import RUSSIAN_PLURAL_FORMS
+from ..constants import RUSSIAN_PLURAL_FORMS, PAGE_RANGE_ON_EACH_SIDE, PAGE_RANGE_ON_ENDS
 from ..utils import pluralize_russian, pluralize_russian_by_type
+from ..permissions import get_permission_context
+from ..images import build_srcset
 
 register = template.Library()
 
@@ -15,13 +16,12 @@ def is_liked_by(post, user):
 @register.filter
 def comment_count(post):
     """Возвращает количество комментариев к посту"""
-    return Comment.objects.filter(post=post).count()
+    return post.comments_count
 
 @register.filter
 def comment_count_text(post):
     """Возвращает количество комментариев с правильным склонением"""
-    count = Comment.objects.filter(post=post).count()
-    return pluralize_russian_by_type(count, 'comment')
+    return pluralize_russian_by_type(post.comments_count, 'comment')
 
 @register.filter
 def views_count_text(views):
@@ -45,17 +45,17 @@ def can_delete_comment(comment, user):
     """
     if not user.is_authenticated:
         return False
+    # Сравниваем по id, чтобы не загружать автора комментария и пост
     return (
-        user == comment.user or 
-        user == comment.post.user or 
+        user.id == comment.user_id or 
+        user.id == comment.post.user_id or 
         user.is_superuser
     )
 
 @register.filter
 def can_create_posts(user):
-    """Проверяет, может ли пользователь создавать посты"""
-    from ..models import Post
-    return Post.can_create_posts(user)
+    """Проверяет, может ли пользователь создавать посты (контекст прав запроса)"""
+    return get_permission_context(user).can_create_posts
 
 @register.filter
 def is_liked_by_comment(comment, user):
@@ -66,7 +66,30 @@ def is_liked_by_comment(comment, user):
 
 @register.filter
 def can_edit_post(post, user):
-    """Проверяет, может ли пользователь редактировать пост"""
-    return post.can_edit(user)
+    """Проверяет, может ли пользователь редактировать пост (контекст прав запроса)"""
+    return get_permission_context(user).can_edit(post)
+
+@register.simple_tag
+def elided_page_range(page_obj):
+    """
+    Возвращает номера страниц вокруг текущей и на краях с многоточиями
+
+    Пример: {% elided_page_range page_obj as pages %}
+    """
+    return list(page_obj.paginator.get_elided_page_range(
+        page_obj.number,
+        on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+        on_ends=PAGE_RANGE_ON_ENDS
+    ))
+
+@register.simple_tag
+def post_srcset(post, fmt='jpeg'):
+    """
+    Возвращает srcset из уменьшенных копий изображения поста
+
+    Пустая строка, если копий еще нет (шаблон использует оригинал).
+    Пример: <source type="image/webp" srcset="{% post_srcset post 'webp' %}">
+    """
+    return build_srcset(post.image_derivatives or {}, fmt)
 
 # Функции склонения теперь в utils.py
@@ -1,3 +1,106 @@
+from unittest import skipUnless
+from django.db import connection
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from .constants import SORT_FIELDS, SORT_NEWEST
+from .models import Category, Comment, CommentLike, Post, PostLike, PostView
+from .views import _get_filtered_and_sorted_posts
 
-# Create your tests here.
+PAGE_SIZE = 12
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Формат плана проверяется для SQLite')
+class ListingQueryPlanTests(TestCase):
+    """Горячие запросы лент и страниц используют индексы без сортировки и полного просмотра"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name='Наука')
+
+    def assertUsesIndex(self, queryset, table, rowid_order=False):
+        """
+        Проверяет план запроса: нет сортировки во временном B-дереве и нет
+        полного просмотра таблицы. При rowid_order=True (ORDER BY id) обход
+        таблицы допустим: SQLite идет по первичному ключу и останавливается на LIMIT.
+        """
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan, f'Сортировка вне индекса:\n{queryset.query}\n{plan}')
+        for line in plan.splitlines():
+            if f'SCAN {table}' in line and not rowid_order:
+                self.assertIn('INDEX', line, f'Полный просмотр {table}:\n{queryset.query}\n{plan}')
+        self.assertIn(table, plan)
+
+    def test_feed_sorts(self):
+        for sort_by in SORT_FIELDS:
+            with self.subTest(sort=sort_by):
+                posts = _get_filtered_and_sorted_posts(None, sort_by)[:PAGE_SIZE]
+                self.assertUsesIndex(posts, 'wordflow_post', rowid_order=sort_by == SORT_NEWEST)
+
+    def test_category_feed_sorts(self):
+        for sort_by in SORT_FIELDS:
+            with self.subTest(sort=sort_by):
+                posts = _get_filtered_and_sorted_posts('наука', sort_by)[:PAGE_SIZE]
+                self.assertUsesIndex(posts, 'wordflow_post')
+
+    def test_user_posts_preview(self):
+        posts = Post.objects.for_cards().filter(user_id=1).order_by('-id')[:PAGE_SIZE]
+        self.assertUsesIndex(posts, 'wordflow_post')
+
+    def test_comment_thread(self):
+        comments = Comment.objects.filter(post_id=1).select_related('user')
+        self.assertUsesIndex(comments, 'wordflow_comment')
+
+    def test_user_like_and_view_lookups(self):
+        self.assertUsesIndex(
+            PostLike.objects.filter(user_id=1, post_id__in=[1, 2, 3]).values_list('post_id'),
+            'wordflow_postlike'
+        )
+        self.assertUsesIndex(PostView.objects.filter(post_id=1, user_id=1), 'wordflow_postview')
+        self.assertUsesIndex(
+            CommentLike.objects.filter(user_id=1, comment__post_id=1).values_list('comment_id'),
+            'wordflow_commentlike'
+        )
+
+
+class CommentCounterTests(TestCase):
+    """Денормализованный счетчик комментариев поста"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='x')
+        self.post = Post.objects.create(postname='Пост', content='<p>Текст</p>', user=self.user, image='a.jpg')
+        self.comment = Comment.objects.create(post=self.post, user=self.user, content='Комментарий')
+        Comment.objects.create(post=self.post, user=self.user, content='Ответ', parent=self.comment)
+
+    def test_repeated_soft_delete_decrements_once(self):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.client.force_login(self.user)
+        for _ in range(3):
+            self.client.get(reverse('deletecomment', args=[self.comment.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class PostSaveTests(TestCase):
+    """Полное сохранение поста не перезаписывает атомарно изменяемые поля"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='x')
+        self.reader = User.objects.create_user('reader', password='x')
+        self.post = Post.objects.create(postname='Пост', content='<p>Текст</p>', user=self.author, image='a.jpg')
+
+    def test_edit_after_like_keeps_likes_and_changes_card_version(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.objects.get(pk=self.post.pk).toggle_like(self.reader)
+        liked_version = Post.objects.get(pk=self.post.pk).card_version
+
+        stale.postname = 'Новое название'
+        stale.save()
+
+        self.assertEqual(stale.likes, 1)
+        self.assertGreater(stale.card_version, liked_version)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 1)
+        self.assertEqual(self.post.postname, 'Новое название')
+        self.assertEqual(self.post.card_version, stale.card_version)
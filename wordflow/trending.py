@@ -0,0 +1,87 @@
+"""
+Рейтинг «в тренде» для постов WordFlow
+
+hot_score = ln(1 + взвешенная активность) + (время создания - эпоха) / tau.
+Порядок по такой оценке совпадает с порядком по активности, затухающей
+экспоненциально с возрастом поста (вдвое за TRENDING_HALF_LIFE_HOURS), и не
+меняется с течением времени, поэтому колонку не нужно пересчитывать
+по часам: она обновляется при лайках, просмотрах и комментариях, а
+периодическая команда refresh_hot_scores исправляет накопленную погрешность.
+"""
+
+import math
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Greatest, Ln
+from .constants import TRENDING_HALF_LIFE_HOURS, TRENDING_WEIGHTS
+
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+# Постоянная затухания: за период полураспада оценка уменьшается на ln 2
+TRENDING_TAU_SECONDS = TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+
+def time_base(created_at) -> float:
+    """Вклад времени создания в оценку"""
+    return (created_at - TRENDING_EPOCH).total_seconds() / TRENDING_TAU_SECONDS
+
+
+def engagement(likes: int, views: int, comments: int) -> float:
+    """Взвешенная активность; не меньше 1, даже если счетчики разошлись в минус"""
+    return max(
+        1 + TRENDING_WEIGHTS['likes'] * likes
+        + TRENDING_WEIGHTS['views'] * views
+        + TRENDING_WEIGHTS['comments_count'] * comments,
+        1
+    )
+
+
+def compute_hot_score(likes: int, views: int, comments: int, created_at) -> float:
+    """Оценка поста по значениям счетчиков"""
+    return math.log(engagement(likes, views, comments)) + time_base(created_at)
+
+
+def _clamped(expression):
+    """Аргумент логарифма не меньше 1: ошибка счетчиков не должна делать оценку NULL"""
+    return Greatest(expression, Value(1.0), output_field=FloatField())
+
+
+def _engagement_expression():
+    expression = Value(1.0)
+    for field, weight in TRENDING_WEIGHTS.items():
+        expression = expression + Value(float(weight)) * F(field)
+    return expression
+
+
+def hot_score_update(applied: bool = False, **deltas):
+    """
+    Выражение для UPDATE, сдвигающее hot_score при изменении счетчиков
+
+    Вклад времени создания уже содержится в колонке, поэтому к ней
+    добавляется только разность логарифмов активности.
+
+    Args:
+        applied: счетчики в строке уже изменены предыдущим UPDATE; иначе
+            выражение стоит в том же UPDATE и видит прежние значения
+        deltas: изменения счетчиков, числа или выражения
+    """
+    shift = Value(0.0)
+    for field, delta in deltas.items():
+        if not hasattr(delta, 'resolve_expression'):
+            delta = Value(delta)
+        shift = shift + Value(float(TRENDING_WEIGHTS[field])) * delta
+    current = _engagement_expression()
+    before, after = (current - shift, current) if applied else (current, current + shift)
+    return ExpressionWrapper(
+        F('hot_score') + Ln(_clamped(after)) - Ln(_clamped(before)), output_field=FloatField()
+    )
+
+
+def hot_score_expression(bases: Dict[int, float]):
+    """Выражение полной оценки для постов с известным вкладом времени {id: вклад}"""
+    base = Case(
+        *[When(pk=post_id, then=Value(value)) for post_id, value in bases.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return ExpressionWrapper(Ln(_clamped(_engagement_expression())) + base, output_field=FloatField())
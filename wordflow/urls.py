@@ -5,6 +5,8 @@ urlpatterns = [
     path("",views.index,name="index"),
     path("blog",views.blog,name="blog"),
     path("posts",views.posts_filtered,name="posts_filtered"),
+    path("search",views.search,name="search"),
+    path("img/resize",views.resize_image,name="resize_image"),
     path("signin",views.signin,name="signin"),
     path("signup",views.signup,name="signup"),
     path("logout",views.logout,name="logout"),
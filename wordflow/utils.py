@@ -141,6 +141,12 @@ def safe_int(value: Any, default: int = 0) -> int:
         return default
 
 
+def cache_is_shared() -> bool:
+    """Виден ли кеш по умолчанию всем процессам приложения"""
+    backend = settings.CACHES['default']['BACKEND']
+    return not backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
 def truncate_text(text: str, max_length: int = 100, suffix: str = '...') -> str:
     """
     Обрезает текст до указанной длины
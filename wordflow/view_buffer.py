@@ -0,0 +1,117 @@
+"""
+Буфер отложенной записи просмотров постов для приложения WordFlow
+
+Просмотры накапливаются в памяти процесса и периодически сбрасываются
+в базу одним пакетным UPDATE вида ``views = views + n``, поэтому чтение
+поста не превращается в запись самой горячей строки таблицы.
+"""
+
+import atexit
+import threading
+from typing import Dict
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+from .logging_config import performance_logger
+from .models import Post
+from .trending import hot_score_update
+
+# Интервал сброса по умолчанию (в секундах)
+DEFAULT_VIEW_COUNT_FLUSH_INTERVAL = 10
+
+# Максимальное количество постов в одном UPDATE
+VIEW_COUNT_FLUSH_BATCH_SIZE = 500
+
+
+class ViewCountBuffer:
+    """
+    Потокобезопасный накопитель просмотров для одного процесса
+
+    Фоновый поток сбрасывает накопленные приращения каждые
+    ``VIEW_COUNT_FLUSH_INTERVAL`` секунд, а при завершении процесса
+    остаток гарантированно сбрасывается через ``atexit``.
+    Нулевой интервал отключает буферизацию (запись сразу).
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', DEFAULT_VIEW_COUNT_FLUSH_INTERVAL)
+
+    def add(self, post_id: int, count: int = 1) -> None:
+        """Добавляет просмотры поста в буфер"""
+        if self.flush_interval <= 0:
+            Post.objects.filter(pk=post_id).update(
+                views=F('views') + count, hot_score=hot_score_update(views=count)
+            )
+            return
+
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + count
+        self._ensure_started()
+
+    def flush(self) -> int:
+        """
+        Сбрасывает накопленные просмотры в базу
+
+        Returns:
+            Количество обновленных постов
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        flushed = 0
+        try:
+            for start in range(0, len(items), VIEW_COUNT_FLUSH_BATCH_SIZE):
+                batch = items[start:start + VIEW_COUNT_FLUSH_BATCH_SIZE]
+                increment = Case(
+                    *[When(pk=post_id, then=Value(count)) for post_id, count in batch],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                Post.objects.filter(pk__in=[post_id for post_id, _ in batch]).update(
+                    views=F('views') + increment,
+                    hot_score=hot_score_update(views=increment)
+                )
+                flushed += len(batch)
+        except Exception as e:
+            # Возвращаем несброшенный остаток в буфер, чтобы не потерять просмотры
+            with self._lock:
+                for post_id, count in items[flushed:]:
+                    self._pending[post_id] = self._pending.get(post_id, 0) + count
+            performance_logger.error(f'Ошибка при сбросе буфера просмотров: {str(e)}')
+        return flushed
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток и сбрасывает остаток"""
+        self._stop.set()
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='wordflow-view-buffer', daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            # Поток держит собственное соединение с базой, закрываем его между сбросами
+            connection.close()
+
+
+view_buffer = ViewCountBuffer()
@@ -1,46 +1,69 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
+from django.http import (
+    FileResponse, Http404, HttpResponseForbidden, HttpResponseNotModified, JsonResponse
+)
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages, auth
 from django.contrib.auth import authenticate, login
 from django.conf import settings
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
-from .models import Post, Comment, PostEditor, GlobalEditor, Category
+from .models import Post, Comment, PostEditor, GlobalEditor, Category, PostLike, CommentLike
 from .forms import PostForm, CustomUserCreationForm
 from .constants import (
-    POSTS_PER_PAGE_INDEX, POSTS_PER_PAGE_BLOG, USER_POSTS_PREVIEW_COUNT,
-    SORT_NEWEST, SORT_LIKES, SORT_VIEWS, SORT_COMMENTS, MESSAGES
+    POSTS_PER_PAGE_INDEX, POSTS_PER_PAGE_BLOG, USER_POSTS_PREVIEW_COUNT, SEARCH_RESULTS_PER_PAGE,
+    SORT_NEWEST, SORT_FIELDS, MAX_OFFSET_PAGES, POST_CARD_CACHE_TIMEOUT, IMMUTABLE_MEDIA_MAX_AGE,
+    MEDIA_MAX_AGE
 )
-from .logging_config import auth_logger, post_logger, security_logger, main_logger
-
-
+from .logging_config import auth_logger, post_logger, security_logger
+from .search import search_posts
+from .comments import load_comment_thread
+from .deletion import delete_posts, tombstone_posts
+from .resize import CONTENT_TYPES, get_resized_image, source_version, validate_resize_request
+from .media import media_response
+from .pagination import CachedCountPaginator, CursorPaginator, CURSOR_NEXT
+from .page_cache import cache_anonymous_page
+from .view_buffer import view_buffer
+from .categories import category_registry
+
+
+@cache_anonymous_page()
 def index(request):
     """
     Главная страница с постами, сортировкой и фильтрацией по категориям
     """
     sort_by = request.GET.get('sort', SORT_NEWEST)
-    category_filter = request.GET.get('category')
-    page_number = request.GET.get('page', 1)
+    if sort_by not in SORT_FIELDS:
+        sort_by = SORT_NEWEST
+    category_filter = request.GET.get('category', '').strip()
+    category = category_registry.resolve(category_filter)
 
     # Получаем посты пользователя для превью
     user_posts = _get_user_posts_preview(request.user)
 
     # Получаем все посты с фильтрацией и сортировкой
-    main_posts = _get_filtered_and_sorted_posts(category_filter, sort_by)
+    main_posts = _get_filtered_and_sorted_posts(category_filter, sort_by, request.user)
 
     # Пагинация
-    paginator = Paginator(main_posts, POSTS_PER_PAGE_INDEX)
-    page_obj = paginator.get_page(page_number)
+    page_obj = _paginate_posts(
+        request, main_posts, POSTS_PER_PAGE_INDEX, sort_by,
+        count_key=f'index:{category.id if category else category_filter}:{sort_by}',
+        approximate=not category_filter
+    )
+
+    # Лайки текущего пользователя для всех карточек страницы одним запросом
+    user_posts = list(user_posts)
+    liked_post_ids = _get_liked_post_ids(request.user, user_posts, page_obj.object_list)
     
     return render(request, "index.html", {
         'posts': user_posts,
         'top_posts': page_obj,
         'page_obj': page_obj,
-        'categories': Category.objects.all(),
+        'liked_post_ids': liked_post_ids,
+        'categories': category_registry.all(),
         'current_sort': sort_by,
-        'current_category': category_filter,
+        'current_category': category.slug if category else category_filter,
+        'card_cache_timeout': POST_CARD_CACHE_TIMEOUT,
         'user': request.user,
         'media_url': settings.MEDIA_URL
     })
@@ -49,37 +72,156 @@ def index(request):
 def _get_user_posts_preview(user):
     """Возвращает превью постов пользователя"""
     if user.is_authenticated:
-        return Post.objects.filter(user_id=user.id).order_by("-id")[:USER_POSTS_PREVIEW_COUNT]
+        return Post.objects.for_cards(user).filter(user_id=user.id).order_by("-id")[:USER_POSTS_PREVIEW_COUNT]
     return Post.objects.none()
 
 
-def _get_filtered_and_sorted_posts(category_filter, sort_by):
-    """Получает отфильтрованные и отсортированные посты"""
-    posts = Post.objects.all()
+def _get_liked_post_ids(user, *post_lists):
+    """
+    Возвращает множество id постов из списков, лайкнутых пользователем
 
-    # Фильтрация по категории
-    if category_filter and category_filter.strip():
-        if category_filter.isdigit():
-            posts = posts.filter(category_obj_id=category_filter)
-        else:
-            posts = posts.filter(
-                Q(category_obj__name__icontains=category_filter) | 
-                Q(category__icontains=category_filter)
-            )
+    Для постов из for_cards(user) используется аннотация is_liked,
+    для остальных выполняется один запрос.
+    """
+    if not user.is_authenticated:
+        return set()
+    liked, unknown = set(), set()
+    for posts in post_lists:
+        for post in posts:
+            is_liked = getattr(post, 'is_liked', None)
+            if is_liked is None:
+                unknown.add(post.id)
+            elif is_liked:
+                liked.add(post.id)
+    if unknown:
+        liked.update(
+            PostLike.objects.filter(user=user, post_id__in=unknown).values_list('post_id', flat=True)
+        )
+    return liked
+
+
+def _get_liked_comment_ids(user, post):
+    """Возвращает множество id комментариев поста, лайкнутых пользователем (один запрос)"""
+    if not user.is_authenticated:
+        return set()
+    return set(
+        CommentLike.objects.filter(user=user, comment__post=post).values_list('comment_id', flat=True)
+    )
+
+
+def _get_filtered_and_sorted_posts(category_filter, sort_by, user=None):
+    """Получает отфильтрованные и отсортированные посты в проекции карточек"""
+    posts = Post.objects.for_cards(user)
+
+    posts = _filter_by_category(posts, category_filter)
     
-    # Сортировка
-    if sort_by == SORT_LIKES:
-        posts = posts.annotate(num_likes=Count('liked_by', distinct=True)).order_by('-num_likes', '-id')
-    elif sort_by == SORT_VIEWS:
-        posts = posts.order_by('-views', '-id')
-    elif sort_by == SORT_COMMENTS:
-        posts = posts.annotate(num_comments=Count('comment', distinct=True)).order_by('-num_comments', '-id')
+    # Сортировка по денормализованным счетчикам (поддерживаются атомарно)
+    sort_field = SORT_FIELDS.get(sort_by)
+    if sort_field:
+        posts = posts.order_by(f'-{sort_field}', '-id')
     else:  # SORT_NEWEST
         posts = posts.order_by('-id')
     
     return posts
 
 
+def _filter_by_category(posts, category_filter):
+    """
+    Фильтрует посты по категории из ?category= (id, slug или точное название)
+
+    Категория находится в каталоге без запроса; неизвестное значение дает пустой список.
+    """
+    if not category_filter or not category_filter.strip():
+        return posts
+    category = category_registry.resolve(category_filter)
+    if category is None:
+        return posts.none()
+    return posts.filter(category_obj_id=category.id)
+
+
+def _paginate_posts(request, posts, per_page, sort_by=SORT_NEWEST, count_key=None, approximate=False):
+    """
+    Пагинация ленты постов
+
+    Параметр ?cursor= включает keyset-пагинацию по (поле сортировки, id).
+    Первые MAX_OFFSET_PAGES страниц доступны по ?page=, а ссылка «дальше»
+    с последней из них переходит на курсор. Количество постов для
+    нумерованных страниц кешируется по count_key.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        paginator = CursorPaginator(posts, per_page, SORT_FIELDS.get(sort_by))
+        return paginator.get_page(cursor)
+
+    paginator = CachedCountPaginator(posts, per_page, count_key=count_key, approximate=approximate)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    page_obj.object_list = list(page_obj.object_list)
+    if page_obj.number >= MAX_OFFSET_PAGES and page_obj.has_next() and page_obj.object_list:
+        cursor_paginator = CursorPaginator(posts, per_page, SORT_FIELDS.get(sort_by))
+        page_obj.next_cursor = cursor_paginator.encode_cursor(page_obj.object_list[-1], CURSOR_NEXT)
+    return page_obj
+
+
+def resize_image(request):
+    """
+    Отдает уменьшенную копию картинки из загрузок CKEditor
+
+    Параметры: src (путь в MEDIA_ROOT), w (ширина), fmt (webp или jpeg),
+    v (версия источника). Адрес с текущей версией неизменен и кешируется
+    браузером навсегда; без версии или с устаревшей версией - как обычный файл.
+    """
+    try:
+        source, width, fmt = validate_resize_request(
+            request.GET.get('src', ''), request.GET.get('w'), request.GET.get('fmt', 'jpeg')
+        )
+        path, key = get_resized_image(source, width, fmt)
+        is_current = request.GET.get('v') == source_version(source)
+    except (ValueError, OSError):
+        raise Http404("Изображение не найдено")
+
+    etag = f'"{key}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    if is_current:
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MEDIA_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}'
+    return response
+
+
+def serve_media(request, path):
+    """Отдает медиафайл (через фронт-прокси, если он настроен)"""
+    return media_response(request, path)
+
+
+def search(request):
+    """
+    Полнотекстовый поиск по постам с ранжированием BM25
+    """
+    query = request.GET.get('q', '').strip()
+    page_number = request.GET.get('page', 1)
+
+    paginator = Paginator(search_posts(query), SEARCH_RESULTS_PER_PAGE)
+    page_obj = paginator.get_page(page_number)
+
+    # Загружаем посты страницы одним запросом, сохраняя порядок релевантности
+    post_ids = [hit['post_id'] for hit in page_obj.object_list]
+    posts_by_id = Post.objects.for_cards(request.user).in_bulk(post_ids)
+    page_obj.object_list = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+    return render(request, "search.html", {
+        'query': query,
+        'results': page_obj,
+        'page_obj': page_obj,
+        'liked_post_ids': _get_liked_post_ids(request.user, page_obj.object_list),
+        'user': request.user,
+        'media_url': settings.MEDIA_URL
+    })
+
+
 def signup(request):
     """
     Регистрация нового пользователя
@@ -153,25 +295,27 @@ def logout(request):
     return redirect('index')
 
 
+@cache_anonymous_page()
 def blog(request):
     """
     Страница блога со всеми постами
     """
-    page_number = request.GET.get('page', 1)
-
     # Получаем посты пользователя для превью
     user_posts = _get_user_posts_preview(request.user)
 
     # Все посты по дате
-    all_posts = Post.objects.all().order_by("-id")
+    all_posts = Post.objects.for_cards(request.user).order_by("-id")
 
-    paginator = Paginator(all_posts, POSTS_PER_PAGE_BLOG)
-    page_obj = paginator.get_page(page_number)
+    page_obj = _paginate_posts(request, all_posts, POSTS_PER_PAGE_BLOG, count_key='blog', approximate=True)
+
+    liked_post_ids = _get_liked_post_ids(request.user, page_obj.object_list)
     
     return render(request, "blog.html", {
         'posts': user_posts,
         'recent_posts': page_obj,
         'page_obj': page_obj,
+        'liked_post_ids': liked_post_ids,
+        'card_cache_timeout': POST_CARD_CACHE_TIMEOUT,
         'user': request.user,
         'media_url': settings.MEDIA_URL
     })
@@ -211,7 +355,7 @@ def create(request):
     
     return render(request, "create.html", {
         'form': form,
-        'categories': Category.objects.all()
+        'categories': category_registry.all()
     })
 
 
@@ -226,10 +370,8 @@ def _create_post_with_category(form, user):
     if new_category:
         category, created = Category.objects.get_or_create(name=new_category)
         post.category_obj = category
-        post.category = new_category
     elif category_choice:
         post.category_obj = category_choice
-        post.category = category_choice.name
     
     post.save()
     return post
@@ -237,8 +379,8 @@ def _create_post_with_category(form, user):
 
 def profile(request, id):
     profile_user = User.objects.get(id=id)
-    authored_posts = Post.objects.filter(user_id=id)
-    editable_posts = Post.objects.filter(editors=profile_user)
+    authored_posts = Post.objects.for_cards().filter(user_id=id)
+    editable_posts = Post.objects.for_cards().filter(editors=profile_user)
 
     global_editors = []
     available_users = []
@@ -388,7 +530,7 @@ def assign_editor_ajax(request, post_id):
 def toggle_like(request, id):
     """Переключает лайк на посте (добавляет или убирает)"""
     if request.method == 'POST':
-        post = get_object_or_404(Post, id=id)
+        post = get_object_or_404(Post.objects.only('id', 'postname', 'likes'), id=id)
         is_liked = post.toggle_like(request.user)
 
         if is_liked:
@@ -413,28 +555,41 @@ def toggle_like(request, id):
         return redirect('post', id=id)
 
 
+def _mark_anonymous_view(request, post_id):
+    """Отмечает просмотр поста в сессии; возвращает True, если просмотр новый"""
+    session_key = f'viewed_post_{post_id}'
+    if request.session.get(session_key, False):
+        return False
+    request.session[session_key] = True
+    timeout = getattr(settings, 'ANONYMOUS_VIEW_SESSION_TIMEOUT', 86400)
+    request.session.set_expiry(timeout)
+    return True
+
+
+def _count_cached_post_view(request, id):
+    """Засчитывает анонимный просмотр страницы поста, отданной из кеша"""
+    if _mark_anonymous_view(request, id):
+        view_buffer.add(id)
+
+
+@cache_anonymous_page(post_kwarg='id', on_hit=_count_cached_post_view)
 def post(request, id):
-    post = get_object_or_404(Post, id=id)
+    post = get_object_or_404(Post.objects.select_related('user', 'category_obj'), id=id)
 
     if request.user.is_authenticated:
         post.add_view(request.user)
-    else:
-        session_key = f'viewed_post_{post.id}'
-
-        if not request.session.get(session_key, False):
-            post.views += 1
-            post.save()
-            request.session[session_key] = True
-            timeout = getattr(settings, 'ANONYMOUS_VIEW_SESSION_TIMEOUT', 86400)
-            request.session.set_expiry(timeout)
+    elif _mark_anonymous_view(request, post.id):
+        post.add_view()
 
     return render(request, "post-details.html", {
         "user": request.user,
         'post': post,
-        'recent_posts': Post.objects.all().order_by("-id")[:5],
+        'recent_posts': Post.objects.for_cards().order_by("-id")[:5],
         'media_url': settings.MEDIA_URL,
-        'comments': Comment.objects.filter(post=post),
-        'total_comments': Comment.objects.filter(post=post).count()
+        'comments': load_comment_thread(post),
+        'total_comments': post.comments_count,
+        'liked_post_ids': _get_liked_post_ids(request.user, [post]),
+        'liked_comment_ids': _get_liked_comment_ids(request.user, post),
     })
 
 
@@ -484,7 +639,7 @@ def reply_comment(request, comment_id):
 @login_required
 def toggle_comment_like(request, comment_id):
     """Переключение лайка комментария"""
-    comment = get_object_or_404(Comment, id=comment_id)
+    comment = get_object_or_404(Comment.objects.only('id', 'post_id', 'likes'), id=comment_id)
     
     if request.method == 'POST':
         is_liked = comment.toggle_like(request.user)
@@ -497,7 +652,7 @@ def toggle_comment_like(request, comment_id):
                 'success': True
             })
     
-    return redirect('post', id=comment.post.id)
+    return redirect('post', id=comment.post_id)
 
 
 @login_required
@@ -521,13 +676,10 @@ def editpost(request, id):
                 if new_category:
                     category, created = Category.objects.get_or_create(name=new_category)
                     post.category_obj = category
-                    post.category = new_category
                 elif category_choice:
                     post.category_obj = category_choice
-                    post.category = category_choice.name
                 else:
                     post.category_obj = None
-                    post.category = ''
 
                 post.save()
 
@@ -555,7 +707,7 @@ def editpost(request, id):
     return render(request, "postedit.html", {
         'form': form,
         'post': post,
-        'categories': Category.objects.all()
+        'categories': category_registry.all()
     })
 
 
@@ -566,7 +718,10 @@ def deletepost(request, id):
     if request.user != post.user and not request.user.is_superuser:
         return HttpResponseForbidden("У вас нет прав для удаления этого поста")
 
-    post.delete()
+    if getattr(settings, 'POST_TOMBSTONE_DELETE', False):
+        tombstone_posts([post.id])
+    else:
+        delete_posts([post.id])
     messages.success(request, "Пост успешно удален")
     return redirect('profile', id=request.user.id)
 
@@ -577,22 +732,22 @@ def admin_posts(request):
         return HttpResponseForbidden("Только для администраторов")
 
     return render(request, "admin_posts.html", {
-        'all_posts': Post.objects.all().order_by("-id"),
+        'all_posts': Post.objects.for_cards().order_by("-id"),
         'media_url': settings.MEDIA_URL,
     })
 
 
 def get_popular_posts(limit=5):
     """Возвращает самые популярные посты по количеству просмотров"""
-    return Post.objects.all().order_by("-views")[:limit]
+    return Post.objects.for_cards().order_by("-views")[:limit]
 
 
 def index_with_views(request):
     return render(request, "index.html", {
-        'posts': Post.objects.filter(user_id=request.user.id).order_by("id").reverse(),
-        'top_posts': Post.objects.all().order_by("-likes"),
+        'posts': Post.objects.for_cards(request.user).filter(user_id=request.user.id).order_by("-id"),
+        'top_posts': Post.objects.for_cards(request.user).order_by("-likes"),
         'popular_posts': get_popular_posts(5),
-        'recent_posts': Post.objects.all().order_by("-id"),
+        'recent_posts': Post.objects.for_cards(request.user).order_by("-id"),
         'user': request.user,
         'media_url': settings.MEDIA_URL
     })
@@ -692,18 +847,10 @@ def posts_filtered(request):
     from .models import Category, Comment
     from django.db.models import Count
     
-    posts = Post.objects.all()
+    posts = Post.objects.for_cards(request.user)
 
     category_filter = request.GET.get('category')
-    if category_filter:
-        if category_filter.isdigit():
-            posts = posts.filter(category_obj_id=category_filter)
-        else:
-            from django.db.models import Q
-            posts = posts.filter(
-                Q(category_obj__name__icontains=category_filter) | 
-                Q(category__icontains=category_filter)
-            )
+    posts = _filter_by_category(posts, category_filter)
 
     sort_by = request.GET.get('sort', 'newest')
     if sort_by == 'likes':
@@ -711,13 +858,15 @@ def posts_filtered(request):
     elif sort_by == 'views':
         posts = posts.order_by('-views')
     elif sort_by == 'comments':
-        posts = posts.annotate(comment_count=Count('comment')).order_by('-comment_count')
+        posts = posts.order_by('-comments_count')
+    elif sort_by == 'trending':
+        posts = posts.order_by('-hot_score', '-id')
     else: 
         posts = posts.order_by('-id')
     
     return render(request, "posts_filtered.html", {
         'posts': posts,
-        'categories': Category.objects.all(),
+        'categories': category_registry.all(),
         'current_category': category_filter,
         'current_sort': sort_by,
         'media_url': settings.MEDIA_URL,